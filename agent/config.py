@@ -10,6 +10,8 @@ PROJECT_ROOT = AGENT_DIR.parent
 DATA_DIR = PROJECT_ROOT / "src" / "data"
 PRODUCTS_FILE = DATA_DIR / "products.json"
 ARTICLES_DIR = DATA_DIR / "articles"
+# Agent-only state (caches, indexes). Never shipped with the site.
+CACHE_DIR = AGENT_DIR / ".cache"
 
 # API Keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -25,3 +27,76 @@ USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36
 
 # Site Settings
 SITE_URL = "https://flightriskdrones.com"
+
+# Spider (Link Audit) Settings
+LINK_CHECK_TIMEOUT = int(os.getenv("LINK_CHECK_TIMEOUT", "5"))
+# Max link checks in flight across all hosts, and per individual host
+SPIDER_MAX_CONCURRENCY = int(os.getenv("SPIDER_MAX_CONCURRENCY", "16"))
+SPIDER_PER_HOST_CONCURRENCY = int(os.getenv("SPIDER_PER_HOST_CONCURRENCY", "4"))
+# Amazon soft-404 sniffing stops after this many body bytes (the <title> sits well inside it)
+AMAZON_SNIFF_MAX_BYTES = int(os.getenv("AMAZON_SNIFF_MAX_BYTES", str(48 * 1024)))
+# Link health cache: how long a checked URL is trusted before it is probed again
+LINK_HEALTH_DB = CACHE_DIR / "link_health.sqlite3"
+LINK_HEALTH_TTL_OK_HOURS = float(os.getenv("LINK_HEALTH_TTL_OK_HOURS", "72"))
+LINK_HEALTH_TTL_FAIL_HOURS = float(os.getenv("LINK_HEALTH_TTL_FAIL_HOURS", "6"))
+# Article stat cache: local mtime/size per article, so unchanged ones skip re-hashing
+ARTICLE_MANIFEST_FILE = CACHE_DIR / "article_manifest.json"
+# Published article index (listing metadata + links), read by the site and the Spider
+ARTICLES_INDEX_FILE = DATA_DIR / "articles.index.json"
+# Per-host circuit breaker for outbound HTTP (link checks, image scrapers)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_BASE_BACKOFF_SECONDS = float(os.getenv("CIRCUIT_BASE_BACKOFF_SECONDS", "30"))
+CIRCUIT_MAX_BACKOFF_SECONDS = float(os.getenv("CIRCUIT_MAX_BACKOFF_SECONDS", "600"))
+# Hunter gap analysis: name/brand similarity (0-1) above which a candidate counts as already stocked
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# Hunter market feeds: comma-separated 'builtin', .jsonl/.csv vendor dump paths, or search page URLs
+MARKET_FEEDS = [f.strip() for f in os.getenv("MARKET_FEEDS", "builtin").split(",") if f.strip()]
+MARKET_MIN_RATING = float(os.getenv("MARKET_MIN_RATING", "4.0"))
+# Hunter seen-set: Bloom filter of feed items already evaluated and turned down, rebuilt from the catalog periodically
+HUNTER_SEEN_SET_FILE = CACHE_DIR / "hunter_seen.bloom"
+SEEN_SET_CAPACITY = int(os.getenv("SEEN_SET_CAPACITY", "1000000"))
+SEEN_SET_FP_RATE = float(os.getenv("SEEN_SET_FP_RATE", "0.001"))
+SEEN_SET_REBUILD_DAYS = float(os.getenv("SEEN_SET_REBUILD_DAYS", "7"))
+# Search link resolver: catalog search URLs -> the product page they land on
+RESOLVED_LINKS_DB = CACHE_DIR / "resolved_links.sqlite3"
+RESOLVER_MAX_WORKERS = int(os.getenv("RESOLVER_MAX_WORKERS", "8"))
+RESOLVER_TTL_DAYS = float(os.getenv("RESOLVER_TTL_DAYS", "30"))
+RESOLVER_MISS_TTL_HOURS = float(os.getenv("RESOLVER_MISS_TTL_HOURS", "24"))
+# Builder: products per batched LLM call (description + consensus as structured JSON)
+BUILDER_BATCH_SIZE = int(os.getenv("BUILDER_BATCH_SIZE", "8"))
+# LLM reply cache (content-addressed by model + prompt + params)
+LLM_CACHE_DB = CACHE_DIR / "llm_cache.sqlite3"
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+# LLM execution: worker threads, per-model budgets (requests and tokens per minute), retry backoff
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+LLM_RPM_FAST = int(os.getenv("LLM_RPM_FAST", "15"))
+LLM_TPM_FAST = int(os.getenv("LLM_TPM_FAST", "1000000"))
+LLM_RPM_SMART = int(os.getenv("LLM_RPM_SMART", "2"))
+LLM_TPM_SMART = int(os.getenv("LLM_TPM_SMART", "32000"))
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "500"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "2"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "60"))
+# Products whose LLM content failed; the next Builder run tries them again
+BUILDER_RETRY_FILE = CACHE_DIR / "builder_retry.json"
+# Runs a product may fail in before it is dropped from the retry queue
+BUILDER_MAX_ATTEMPTS = int(os.getenv("BUILDER_MAX_ATTEMPTS", "3"))
+# Builder image pipeline: product images fetched into public/images/parts under content-hash names
+PARTS_IMAGES_DIR = PROJECT_ROOT / "public" / "images" / "parts"
+PLACEHOLDER_IMAGE = "/images/parts/placeholder.png"
+IMAGE_MAX_WORKERS = int(os.getenv("IMAGE_MAX_WORKERS", "8"))
+IMAGE_MIN_DIMENSION = int(os.getenv("IMAGE_MIN_DIMENSION", "300"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = int(os.getenv("IMAGE_FETCH_TIMEOUT", "20"))
+# SHA-256 of the hand-named images in public/images/parts, so dedupe doesn't re-read them every run
+IMAGE_HASH_INDEX_FILE = CACHE_DIR / "image_hashes.json"
+# Catalog write-ahead journal: fold it into products.json once it grows past this many bytes
+PRODUCTS_JOURNAL_COMPACT_BYTES = int(os.getenv("PRODUCTS_JOURNAL_COMPACT_BYTES", str(1024 * 1024)))
+# Author streaming drafts: interrupted posts are resumed from here if younger than the max age
+ARTICLE_DRAFTS_DIR = CACHE_DIR / "drafts"
+ARTICLE_DRAFT_MAX_AGE_HOURS = float(os.getenv("ARTICLE_DRAFT_MAX_AGE_HOURS", "24"))
+ARTICLE_STREAM_ATTEMPTS = int(os.getenv("ARTICLE_STREAM_ATTEMPTS", "3"))
+# Author: persisted BM25 index for picking the products a post features
+PRODUCT_SEARCH_INDEX_FILE = CACHE_DIR / "product_search.json"
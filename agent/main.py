@@ -4,9 +4,14 @@ import logging
 from config import AGENT_DIR
 from modules.spider import Spider
 from modules.hunter import Hunter
-from modules.builder import Builder
+from modules.builder import Builder, load_retry_queue
 from modules.author import Author
 from modules.publisher import Publisher
+from modules.catalog import ProductCatalog
+from modules.link_resolver import LinkResolver
+from modules.host_health import HostHealthTracker
+from modules.image_store import ImageStore
+from modules.llm_cache import LLMCache
 
 # Setup logging
 logging.basicConfig(
@@ -22,6 +27,9 @@ logger = logging.getLogger("FlightRiskAgent")
 def main():
     parser = argparse.ArgumentParser(description="Flight Risk Autonomous Agent")
     parser.add_argument("--dry-run", action="store_true", help="Run without making permanent changes")
+    parser.add_argument("--force-recheck", action="store_true", help="Ignore the link health cache and Hunter seen-set; re-check everything")
+    parser.add_argument("--feed", action="append", help="Market feed for the Hunter (builtin, .jsonl/.csv path or search URL); repeatable, overrides MARKET_FEEDS")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM instead of replaying cached replies (fresh replies are still cached)")
     parser.add_argument("--phase", type=str, choices=["maintenance", "inventory", "content", "deploy", "all"], default="all", help="Specific phase to run")
     
     args = parser.parse_args()
@@ -30,52 +38,80 @@ def main():
     if args.dry_run:
         logger.info("DRY RUN MODE ENABLED")
 
+    # products.json is parsed once and shared by every phase, then flushed once before deployment
+    catalog = ProductCatalog()
+    if not catalog.loaded:
+        # Growing or publishing from a partial catalog would overwrite the real one; only the link audit runs
+        logger.error("products.json could not be loaded; skipping the inventory, content and deploy phases.")
+    # One LLM reply cache for the Builder and the Author
+    llm_cache = LLMCache(bypass=True) if args.no_llm_cache else LLMCache()
+    # One set of per-host circuit breakers for every stage that goes out to the network
+    hosts = HostHealthTracker()
+
     # Shared State for Publisher
     summary_data = {
         "links_fixed": 0,
         "new_products": [],
-        "new_article_title": None
+        "new_article_title": None,
+        # Files the phases wrote; the Publisher stages only these
+        "changed_paths": set()
     }
 
     # Phase 1: Maintenance
     if args.phase in ["maintenance", "all"]:
         logger.info("---| Phase 1: Maintenance (The Spider) |---")
-        spider = Spider(dry_run=args.dry_run)
+        # Resolve stage: map new/stale search links to product pages so the audit can check those instead
+        resolver = LinkResolver(hosts=hosts)
+        resolver.resolve_catalog(catalog.products)
+        spider = Spider(dry_run=args.dry_run, force_recheck=args.force_recheck, catalog=catalog, resolver=resolver, hosts=hosts)
         spider.crawl_and_audit()
         summary_data["links_fixed"] = spider.links_fixed
+        summary_data["changed_paths"] |= spider.changed_paths
 
     # Phase 2 & 3: Inventory Growth & Page Gen
-    if args.phase in ["inventory", "all"]:
+    if args.phase in ["inventory", "all"] and catalog.loaded:
         logger.info("---| Phase 2: Inventory Growth (The Hunter) |---")
-        hunter = Hunter(dry_run=args.dry_run)
+        hunter = Hunter(dry_run=args.dry_run, catalog=catalog, feeds=args.feed, force_recheck=args.force_recheck)
         new_items = hunter.hunt()
         
-        if new_items:
+        # Products whose content failed on an earlier run are retried even if the hunt found nothing new
+        if new_items or load_retry_queue():
             logger.info("---| Phase 3: Page Generation (The Builder) |---")
-            builder = Builder(dry_run=args.dry_run)
-            builder.build_product_pages(new_items)
-            summary_data["new_products"] = new_items
+            images = ImageStore(dry_run=args.dry_run, hosts=hosts)
+            builder = Builder(dry_run=args.dry_run, catalog=catalog, llm_cache=llm_cache, images=images)
+            summary_data["new_products"] = builder.build_product_pages(new_items)
+            summary_data["changed_paths"] |= builder.changed_paths
 
     # Phase 4: Content Marketing
-    if args.phase in ["content", "all"]:
+    if args.phase in ["content", "all"] and catalog.loaded:
         logger.info("---| Phase 4: Content Marketing (The Author) |---")
-        author = Author(dry_run=args.dry_run)
+        author = Author(dry_run=args.dry_run, catalog=catalog, llm_cache=llm_cache)
         # We need to capture the article title if possible, but Author.write_blog_post currently doesn't return it easily
         # to the main scope without modification, but it logs it. 
         # For simplicity, we'll just run it.
         # Ideally, refactor Author to return the title.
         # But for now, we leave it as is.
         author.write_blog_post()
+        summary_data["changed_paths"] |= author.changed_paths
         # Mocking title capture for summary if we wanted to be precise, 
         # but the Publisher handles "None".
 
+    # Persist every phase's catalog edits, and fold the journal into products.json for the site build
+    if not args.dry_run and catalog.compact():
+        summary_data["changed_paths"].add(catalog.path)
+
     # Phase 5: Deployment
-    if args.phase in ["deploy", "all"]:
+    if args.phase in ["deploy", "all"] and catalog.loaded:
         logger.info("---| Phase 5: Deployment |---")
+        if args.phase == "deploy":
+            # Nothing ran this time to report changes; let the Publisher check the agent's usual outputs
+            summary_data["changed_paths"] = None
         publisher = Publisher(dry_run=args.dry_run)
         publisher.publish_changes(summary_data)
 
     logger.info("Agent Run Complete")
+    if not catalog.loaded:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import time
+from config import ARTICLE_DRAFTS_DIR, ARTICLE_DRAFT_MAX_AGE_HOURS
+from modules.atomic import atomic_write_text
+
+logger = logging.getLogger("FlightRiskAgent.Drafts")
+
+class ArticleDraft:
+    """
+    An article being streamed from the LLM. Chunks are appended to `<slug>.md.part` and
+    fsynced as they arrive, and `<slug>.checkpoint.json` records what the draft is (topic,
+    prompt, featured products) and how far it got, so a run that dies mid-stream can pick
+    the draft up next time instead of paying for the whole post again.
+
+    With `dry_run` set nothing touches the disk; the text is only kept in memory.
+    """
+    def __init__(self, slug, directory=ARTICLE_DRAFTS_DIR, dry_run=False):
+        self.slug = slug
+        self.directory = directory
+        self.dry_run = dry_run
+        self.body_path = directory / f"{slug}.md.part"
+        self.checkpoint_path = directory / f"{slug}.checkpoint.json"
+        self.state = {}
+        self._buffer = []
+
+    @classmethod
+    def pending(cls, directory=ARTICLE_DRAFTS_DIR, max_age_hours=ARTICLE_DRAFT_MAX_AGE_HOURS):
+        """The most recent interrupted draft worth resuming, or None. Stale and unreadable drafts are discarded."""
+        if not directory.exists():
+            return None
+        drafts = []
+        for path in directory.glob("*.checkpoint.json"):
+            draft = cls(path.name[:-len(".checkpoint.json")], directory)
+            try:
+                draft.state = json.loads(path.read_text())
+            except Exception as e:
+                logger.warning(f"Discarding draft {draft.slug}: unreadable checkpoint ({e})")
+                draft.discard()
+                continue
+            if time.time() - draft.state.get("updated", 0) > max_age_hours * 3600:
+                logger.info(f"Discarding stale draft {draft.slug}")
+                draft.discard()
+                continue
+            drafts.append(draft)
+        if not drafts:
+            return None
+        drafts.sort(key=lambda d: d.state.get("updated", 0))
+        for stale in drafts[:-1]:
+            logger.info(f"Discarding superseded draft {stale.slug}")
+            stale.discard()
+        return drafts[-1]
+
+    def start(self, topic, prompt, products):
+        """Begins an empty draft and writes its first checkpoint."""
+        now = time.time()
+        self.state = {
+            "topic": topic,
+            "prompt": prompt,
+            "products": products,
+            "started": now,
+            "updated": now,
+            "bytes": 0,
+            "chunks": 0,
+            "attempts": 0,
+        }
+        self._buffer = []
+        if not self.dry_run:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.body_path.write_bytes(b"")
+            self._checkpoint()
+
+    def _checkpoint(self):
+        self.state["updated"] = time.time()
+        if not self.dry_run:
+            atomic_write_text(self.checkpoint_path, json.dumps(self.state, indent=2))
+
+    def begin_attempt(self):
+        self.state["attempts"] = self.state.get("attempts", 0) + 1
+        self._checkpoint()
+
+    def append(self, text):
+        """Durably adds one streamed chunk, then advances the checkpoint."""
+        data = text.encode("utf-8")
+        if self.dry_run:
+            self._buffer.append(text)
+        else:
+            with open(self.body_path, 'ab') as f:
+                # Cut back to the last checkpoint first, in case a crash left half a chunk behind
+                f.truncate(self.state["bytes"])
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        self.state["bytes"] += len(data)
+        self.state["chunks"] += 1
+        self._checkpoint()
+
+    def text(self):
+        """Everything streamed so far, up to the last checkpoint."""
+        if self.dry_run:
+            return "".join(self._buffer)
+        if not self.body_path.exists():
+            return ""
+        with open(self.body_path, 'rb') as f:
+            return f.read(self.state.get("bytes", 0)).decode("utf-8", errors="ignore")
+
+    def discard(self):
+        """Removes the draft files (a dry run never wrote any, and must not touch a real draft's)."""
+        if self.dry_run:
+            return
+        for path in (self.body_path, self.checkpoint_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
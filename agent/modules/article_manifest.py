@@ -0,0 +1,177 @@
+import hashlib
+import json
+import logging
+import re
+from config import ARTICLES_INDEX_FILE, ARTICLE_MANIFEST_FILE
+from modules.atomic import atomic_write_text
+from modules.markdown_links import extract_links, link_matches
+
+logger = logging.getLogger("FlightRiskAgent.ArticleManifest")
+
+FRONTMATTER_PATTERN = re.compile(r'\A---\s*\n(.*?)\n---\s*(?:\n|\Z)', re.DOTALL)
+
+def content_hash(data):
+    """SHA-256 hex digest of article bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+def parse_frontmatter(text):
+    """
+    Splits the simple `key: value` frontmatter our articles use from the body.
+    Quoted strings and [lists] are read as JSON; anything else is kept as a bare string.
+    """
+    match = FRONTMATTER_PATTERN.match(text)
+    if not match:
+        return {}, text
+    meta = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if not sep or not key.strip():
+            continue
+        value = value.strip()
+        if value[:1] in ('"', "["):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = value.strip('"')
+        meta[key.strip()] = value
+    return meta, text[match.end():]
+
+def article_entry(file_path, data, links):
+    """The index record for one article: listing metadata, word count, content hash and outbound links."""
+    meta, body = parse_frontmatter(data.decode("utf-8", errors="replace"))
+    # Author's generated posts carry `categories`; the hand-written ones use `tags`
+    tags = meta.get("tags") or meta.get("categories") or []
+    return {
+        "slug": file_path.stem,
+        "file": file_path.name,
+        "title": meta.get("title", ""),
+        "date": str(meta.get("date", "")),
+        "excerpt": meta.get("excerpt", ""),
+        "author": meta.get("author", ""),
+        "category": meta.get("category", ""),
+        "image": meta.get("image"),
+        "tags": tags if isinstance(tags, list) else [tags],
+        "wordCount": len(body.split()),
+        "hash": content_hash(data),
+        "links": [{"anchor": anchor, "url": url} for anchor, url in links]
+    }
+
+class ArticleManifest:
+    """
+    src/data/articles.index.json: one record per article (slug, title, date, excerpt,
+    tags, word count, content hash, outbound links), newest first. The site lists
+    articles from it without parsing every markdown file, and the Spider reuses the
+    recorded links of unchanged articles instead of re-reading them.
+
+    File mtimes and sizes are machine-local, so they stay out of the published index and
+    live in a small cache file instead; they let unchanged articles skip even the hash.
+    """
+    def __init__(self, path=ARTICLES_INDEX_FILE, stat_path=ARTICLE_MANIFEST_FILE):
+        self.path = path
+        self.stat_path = stat_path
+        self.entries = {}
+        self.stats = {}
+        self.dirty = False
+        self.stats_dirty = False
+        try:
+            if path.exists():
+                with open(path, 'r') as f:
+                    self.entries = {entry["file"]: entry for entry in json.load(f).get("articles", [])}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable article index {path}: {e}")
+            self.entries = {}
+        try:
+            if stat_path.exists():
+                with open(stat_path, 'r') as f:
+                    self.stats = json.load(f).get("stats", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable article stat cache {stat_path}: {e}")
+            self.stats = {}
+
+    def _remember_stat(self, file_path, digest):
+        stat = file_path.stat()
+        self.stats[file_path.name] = [stat.st_mtime_ns, stat.st_size, digest]
+        self.stats_dirty = True
+
+    def unchanged_links(self, file_path):
+        """Returns the recorded links [(anchor, url), ...] if the file is unchanged, otherwise None."""
+        entry = self.entries.get(file_path.name)
+        if not entry:
+            return None
+
+        stat = file_path.stat()
+        cached = self.stats.get(file_path.name)
+        if not cached or cached != [stat.st_mtime_ns, stat.st_size, entry["hash"]]:
+            # Touched (or a fresh checkout), but maybe not edited: the content hash decides
+            if content_hash(file_path.read_bytes()) != entry["hash"]:
+                return None
+            self._remember_stat(file_path, entry["hash"])
+
+        return [(link["anchor"], link["url"]) for link in entry["links"]]
+
+    def record(self, file_path, links):
+        """Stores the index record for a freshly parsed file, logging how its links changed."""
+        old = self.entries.get(file_path.name)
+        if old:
+            old_urls = {link["url"] for link in old["links"]}
+            new_urls = {url for _, url in links}
+            added, removed = new_urls - old_urls, old_urls - new_urls
+            if added or removed:
+                logger.info(f"{file_path.name} changed: {len(added)} links added, {len(removed)} removed")
+
+        entry = article_entry(file_path, file_path.read_bytes(), links)
+        if entry != old:
+            self.entries[file_path.name] = entry
+            self.dirty = True
+        self._remember_stat(file_path, entry["hash"])
+
+    def add(self, file_path):
+        """Reads, parses and records one article (a new post, or a rebuild)."""
+        text = file_path.read_text()
+        self.record(file_path, link_matches(extract_links(text)))
+
+    def rebuild(self, articles_dir):
+        """Re-indexes every markdown file in the directory from scratch."""
+        self.entries = {}
+        self.dirty = True
+        names = []
+        for file_path in sorted(articles_dir.glob("*.md")):
+            names.append(file_path.name)
+            try:
+                self.add(file_path)
+            except Exception as e:
+                logger.error(f"Error indexing {file_path.name}: {e}")
+        self.prune(names)
+
+    def prune(self, names):
+        """Drops entries for articles that no longer exist."""
+        for name in set(self.entries) - set(names):
+            del self.entries[name]
+            self.dirty = True
+        for name in set(self.stats) - set(names):
+            del self.stats[name]
+            self.stats_dirty = True
+
+    def articles(self):
+        """The index records, newest first (the order the site lists them in)."""
+        return sorted(self.entries.values(), key=lambda entry: (entry["date"], entry["slug"]), reverse=True)
+
+    def save(self, write_index=True):
+        """
+        Writes the index and stat cache atomically, each only if it changed. Returns True if
+        the index was written. With write_index off (dry runs) only the local stat cache is saved.
+        """
+        written = False
+        try:
+            if self.dirty and write_index:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(self.path, json.dumps({"articles": self.articles()}, indent=2) + "\n")
+                self.dirty = False
+                written = True
+            if self.stats_dirty:
+                self.stat_path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(self.stat_path, json.dumps({"stats": self.stats}))
+                self.stats_dirty = False
+        except Exception as e:
+            logger.error(f"Failed to save article manifest: {e}")
+        return written
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+def _atomic_write(path, data, mode):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_text(path, text):
+    """
+    Writes text to path via a temp file in the same directory and os.replace,
+    so readers see either the old file or the complete new one, never a partial write.
+    """
+    _atomic_write(path, text, 'w')
+
+def atomic_write_bytes(path, data):
+    """Binary counterpart of atomic_write_text."""
+    _atomic_write(path, data, 'wb')
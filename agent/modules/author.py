@@ -1,20 +1,51 @@
-import json
 import logging
 import random
 import datetime
+import time
 from pathlib import Path
-from config import PRODUCTS_FILE, ARTICLES_DIR, GEMINI_API_KEY, AMAZON_TAG, GEMINI_MODEL_SMART
+from config import ARTICLES_DIR, GEMINI_API_KEY, AMAZON_TAG, GEMINI_MODEL_SMART, ARTICLE_STREAM_ATTEMPTS
+from modules.article_draft import ArticleDraft
+from modules.article_manifest import ArticleManifest
+from modules.atomic import atomic_write_text
+from modules.catalog import ProductCatalog, product_key
+from modules.llm_cache import LLMCache, CachedModel
+from modules.llm_executor import RateLimitedModel
+from modules.product_search import ProductSearchIndex
 import google.generativeai as genai
 
 logger = logging.getLogger("FlightRiskAgent.Author")
 
+def stream_cache_params():
+    """
+    Streamed posts are cached apart from plain generate_content calls, and per publish date:
+    re-running today's failed or dry-run post replays it (to the same {date}-{slug}.md), but a
+    later day that picks the same topic and products writes a fresh post instead of a duplicate.
+    """
+    return {"stream": True, "date": str(datetime.date.today())}
+
+def article_slug(topic):
+    return topic.lower().replace(" ", "-").replace(":", "").replace(",", "")
+
+def chunk_text(chunk):
+    # Chunks without text parts (safety stops, the final usage chunk) raise instead of returning ""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
 class Author:
-    def __init__(self, dry_run=False):
+    def __init__(self, dry_run=False, catalog=None, llm_cache=None):
         self.dry_run = dry_run
+        # Read-only use; shared with the other phases when run from main.py
+        self.catalog = catalog or ProductCatalog()
         self.model = None
+        self.llm_cache = llm_cache or LLMCache()
+        # Files this run wrote, for the Publisher's change set
+        self.changed_paths = set()
         if GEMINI_API_KEY:
             genai.configure(api_key=GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(GEMINI_MODEL_SMART)
+            model = RateLimitedModel(genai.GenerativeModel(GEMINI_MODEL_SMART), GEMINI_MODEL_SMART)
+            self.model = CachedModel(model, GEMINI_MODEL_SMART, self.llm_cache)
         self.topics = [
             "The physics of PID tuning",
             "Battery safety for LiPos",
@@ -33,41 +64,57 @@ class Author:
 
         logger.info("Starting Blog Post Generation...")
 
-        # 1. Select Topic
-        topic = random.choice(self.topics)
-        logger.info(f"Selected topic: {topic}")
+        # 0. Pick up a post an earlier run was interrupted in the middle of
+        draft = None if self.dry_run else ArticleDraft.pending()
+        if draft:
+            topic = draft.state["topic"]
+            logger.info(f"Resuming interrupted draft: {topic} ({draft.state.get('bytes', 0)} bytes so far)")
+        else:
+            # 1. Select Topic
+            topic = random.choice(self.topics)
+            logger.info(f"Selected topic: {topic}")
 
-        # 2. Get Products for Affiliate Integration
-        products_to_link = self.get_products_for_link(3)
+            # 2. Get Products for Affiliate Integration
+            products_to_link = self.get_products_for_link(topic, 3)
+            draft = ArticleDraft(article_slug(topic), dry_run=self.dry_run)
+            draft.start(topic, self.build_prompt(topic, products_to_link), [p.get("name") for p in products_to_link])
 
         # 3. Generate Content
-        content = self.generate_content(topic, products_to_link)
+        content = self.generate_content(draft)
         
         # 4. Save Article
-        if content:
-            self.save_article(topic, content)
+        if content and self.save_article(topic, content):
+            draft.discard()
+        logger.info(f"LLM cache: {self.llm_cache.stats()}")
 
-    def get_products_for_link(self, count=3):
-        """Selects random products to feature."""
+    def get_products_for_link(self, topic, count=3):
+        """Selects the products most relevant to the topic, topped up at random if too few match."""
         try:
-            with open(PRODUCTS_FILE, 'r') as f:
-                data = json.load(f)
-            products = data.get("products", [])
+            products = self.catalog.products
             if not products:
                 return []
             
             # Filter for items that have actual links
-            valid_products = [p for p in products if p.get("amazonLink")]
-            return random.sample(valid_products, min(count, len(valid_products)))
+            valid_products = {product_key(p): p for p in products if p.get("amazonLink")}
+
+            index = ProductSearchIndex()
+            index.sync(products)
+            index.save()
+            picked = [valid_products[key] for key, _ in index.search(topic, count, allowed=valid_products)]
+            logger.info(f"Relevant products for '{topic}': {[p.get('name') for p in picked]}")
+
+            if len(picked) < count:
+                rest = [p for p in valid_products.values() if p not in picked]
+                picked += random.sample(rest, min(count - len(picked), len(rest)))
+            return picked
         except Exception as e:
             logger.error(f"Failed to load products for author: {e}")
             return []
 
-    def generate_content(self, topic, products):
-        """Generates the full blog post with constraints."""
+    def build_prompt(self, topic, products):
         product_context = "\n".join([f"- {p.get('name')}: {p.get('amazonLink')}" for p in products])
         
-        prompt = f"""
+        return f"""
         Write a 1000-1500 word blog post about "{topic}".
         
         **Stylistic Constraints (CRITICAL):**
@@ -85,17 +132,74 @@ class Author:
         **Format:**
         Return ONLY the body of the article in Markdown format. Do not include frontmatter yet.
         """
+
+    def continuation_prompt(self, prompt, so_far):
+        return f"""{prompt}
+        
+        **Continuation:**
+        You already wrote the beginning of this article; it is below between the markers.
+        Continue from exactly where it stops, mid-sentence if need be. Do not repeat any of it.
         
+        <<<BEGIN>>>
+{so_far}
+<<<END>>>
+        """
+
+    def generate_content(self, draft):
+        """
+        Streams the post into the draft, continuing from where an interrupted stream stopped.
+        Returns the finished body, or None if every attempt failed (the draft is kept for the next run).
+        """
+        prompt = draft.state["prompt"]
+        cache_params = stream_cache_params()
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            cached = self.llm_cache.get(GEMINI_MODEL_SMART, prompt, cache_params)
         except Exception as e:
-            logger.error(f"LLM Generation failed: {e}")
-            return None
+            logger.warning(f"LLM cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            return cached.strip()
+
+        for attempt in range(ARTICLE_STREAM_ATTEMPTS):
+            so_far = draft.text()
+            request = self.continuation_prompt(prompt, so_far) if so_far.strip() else prompt
+            draft.begin_attempt()
+            if self.stream_into(draft, request):
+                content = draft.text().strip()
+                try:
+                    self.llm_cache.put(GEMINI_MODEL_SMART, prompt, cache_params, content)
+                except Exception as e:
+                    logger.warning(f"Could not cache LLM reply: {e}")
+                return content or None
+            logger.warning(f"Stream attempt {attempt + 1}/{ARTICLE_STREAM_ATTEMPTS} interrupted after {draft.state['bytes']} bytes")
+        logger.error(f"LLM Generation failed; draft kept for the next run ({draft.state['bytes']} bytes)")
+        return None
+
+    def stream_into(self, draft, prompt):
+        """One streaming request, each chunk appended to the draft as it lands. Returns True if the stream completed."""
+        started = time.monotonic()
+        first_byte = None
+        received = 0
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                text = chunk_text(chunk)
+                if not text:
+                    continue
+                if first_byte is None:
+                    first_byte = time.monotonic() - started
+                draft.append(text)
+                received += len(text)
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            return False
+        total = time.monotonic() - started
+        ttfb = f"{first_byte:.2f}s" if first_byte is not None else "n/a"
+        logger.info(f"LLM stream: time to first byte {ttfb}, total {total:.2f}s, {received} chars")
+        return True
 
     def save_article(self, topic, content):
-        """Saves the article with frontmatter."""
-        slug = topic.lower().replace(" ", "-").replace(":", "").replace(",", "")
+        """Saves the article with frontmatter, atomically. Returns True if it was written."""
+        slug = article_slug(topic)
         filename = f"{datetime.date.today()}-{slug}.md"
         file_path = ARTICLES_DIR / filename
         
@@ -114,8 +218,24 @@ categories: ["Tech", "FPV"]
             # Ensure directory exists
             ARTICLES_DIR.mkdir(exist_ok=True)
             
-            with open(file_path, 'w') as f:
-                f.write(full_text)
+            try:
+                atomic_write_text(file_path, full_text)
+            except Exception as e:
+                logger.error(f"Failed to save article {file_path}: {e}")
+                return False
             logger.info(f"Article published: {file_path}")
+            self.changed_paths.add(file_path)
+            self.index_article(file_path)
         else:
             logger.info(f"DRY RUN: Would save article to {file_path}")
+        return True
+
+    def index_article(self, file_path):
+        """Adds the new post to articles.index.json so the site and Spider see it without a rescan."""
+        try:
+            manifest = ArticleManifest()
+            manifest.add(file_path)
+            if manifest.save():
+                self.changed_paths.add(manifest.path)
+        except Exception as e:
+            logger.error(f"Failed to index article {file_path.name}: {e}")
@@ -1,48 +1,170 @@
 import json
 import logging
 import os
+import re
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from config import PRODUCTS_FILE, GEMINI_API_KEY, PROJECT_ROOT, GEMINI_MODEL_FAST
+from config import (
+    GEMINI_API_KEY, PROJECT_ROOT, GEMINI_MODEL_FAST, BUILDER_BATCH_SIZE, BUILDER_RETRY_FILE,
+    PLACEHOLDER_IMAGE, IMAGE_MAX_WORKERS, BUILDER_MAX_ATTEMPTS
+)
+from modules.catalog import ProductCatalog, product_key
+from modules.llm_cache import LLMCache, CachedModel
+from modules.llm_executor import LLMExecutor, RateLimitedModel
+from modules.atomic import atomic_write_text
+from modules.image_store import ImageStore, ImageRejected, ImageUnavailable
 import google.generativeai as genai
 
 logger = logging.getLogger("FlightRiskAgent.Builder")
 
+# Placeholders earlier runs wrote in place of generated text; treated as "needs generating"
+DESCRIPTION_PLACEHOLDERS = ("", "No description available.", "Description generation failed.")
+CONSENSUS_PLACEHOLDERS = ("", "Consensus review unavailable.", "Consensus generation failed.")
+# Same caps the per-item prompts give the model, with some slack
+MAX_DESCRIPTION_WORDS = 80
+MAX_CONSENSUS_WORDS = 120
+
+def parse_json_reply(text):
+    """Parses a JSON reply, tolerating the ```json fences models like to add."""
+    text = text.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    return json.loads(text)
+
+def load_retry_queue(path=BUILDER_RETRY_FILE):
+    """Products whose LLM content failed on an earlier run, as [{"product": ..., "attempts": n}]."""
+    try:
+        with open(path, 'r') as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"Failed to read retry queue {path}: {e}")
+        return []
+    # Queues written before attempts were counted hold bare products
+    return [entry if "product" in entry else {"product": entry, "attempts": 1} for entry in entries]
+
+def save_retry_queue(entries, path=BUILDER_RETRY_FILE):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(path, json.dumps(entries, indent=2))
+    except Exception as e:
+        logger.error(f"Failed to write retry queue {path}: {e}")
+
 class Builder:
-    def __init__(self, dry_run=False):
+    def __init__(self, dry_run=False, catalog=None, batch_size=BUILDER_BATCH_SIZE, llm_cache=None, executor=None, retry_file=BUILDER_RETRY_FILE, images=None,
+                 max_attempts=BUILDER_MAX_ATTEMPTS):
         self.dry_run = dry_run
+        self.max_attempts = max(1, max_attempts)
+        self.images = images or ImageStore(dry_run=dry_run)
+        self.batch_size = max(1, batch_size)
+        self.executor = executor or LLMExecutor()
+        self.retry_file = retry_file
+        self.built_products = []
+        self.failed_products = []
+        # Image files of the products actually added, for the Publisher's change set
+        self.changed_paths = set()
+        # Shared run-wide catalog from main.py; a standalone Builder loads (and saves) its own
+        self.owns_catalog = catalog is None
+        self.catalog = catalog or ProductCatalog()
         self.model = None
+        self.llm_cache = llm_cache or LLMCache()
         if GEMINI_API_KEY:
             genai.configure(api_key=GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(GEMINI_MODEL_FAST)
+            # Cache first, so replayed replies don't spend rate budget
+            model = RateLimitedModel(genai.GenerativeModel(GEMINI_MODEL_FAST), GEMINI_MODEL_FAST)
+            self.model = CachedModel(model, GEMINI_MODEL_FAST, self.llm_cache)
         
     def build_product_pages(self, new_products):
         """
         Receives a list of new product dicts, enriches them with LLM content,
-        downloads images, and appends to products.json.
+        downloads images, and appends them to the catalog.
         """
+        # Products whose LLM content failed last time go round again
+        queued = load_retry_queue(self.retry_file)
+        attempts = {}
+        if queued:
+            names = {p.get("name") for p in new_products or []}
+            queued = [entry for entry in queued if entry["product"].get("name") not in names]
+            attempts = {entry["product"].get("name"): entry["attempts"] for entry in queued}
+            logger.info(f"Retrying {len(queued)} products whose content generation failed previously.")
+            new_products = [entry["product"] for entry in queued] + list(new_products or [])
+
         if not new_products:
             logger.info("No new products to build.")
-            return
+            return []
 
         logger.info(f"Building {len(new_products)} new product pages...")
         
+        # Images download in the background while the LLM work below runs
+        image_pool = ThreadPoolExecutor(max_workers=IMAGE_MAX_WORKERS, thread_name_prefix="images")
+        try:
+            image_jobs = [image_pool.submit(self.process_image, product) for product in new_products]
+            enriched_products, failed_products = self.build_all(new_products, image_jobs)
+        finally:
+            image_pool.shutdown(wait=True)
+        logger.info(f"Images: {self.images.downloaded} downloaded, {self.images.reused} reused from existing files.")
+
+        # 4. Update Inventory
+        if enriched_products and not self.dry_run:
+            enriched_products = self.update_inventory(enriched_products)
+            # Images of products that failed stay on disk for their retry but are not published
+            self.changed_paths = self.image_files(enriched_products)
+        if not self.dry_run and (failed_products or queued):
+            save_retry_queue(self.retry_entries(failed_products, attempts), self.retry_file)
+
+        logger.info(f"LLM cache: {self.llm_cache.stats()}")
+        self.built_products = enriched_products
+        self.failed_products = failed_products
+        return enriched_products
+
+    def retry_entries(self, failed_products, attempts):
+        """Queue entries for the failed products, dropping those that have now failed `max_attempts` runs."""
+        entries = []
+        for product in failed_products:
+            count = attempts.get(product.get("name"), 0) + 1
+            if count >= self.max_attempts:
+                logger.error(f"Giving up on {product.get('name')}: content generation failed in {count} runs.")
+                continue
+            entries.append({"product": product, "attempts": count})
+        return entries
+
+    def build_all(self, new_products, image_jobs):
+        """LLM content for every product, then the final records. Returns (built, failed)."""
+        # One LLM call per batch of products instead of two per product; entries the batch
+        # reply got wrong fall back to the per-item calls below
+        drafts = self.generate_batched(new_products)
+        # Remaining per-item calls run concurrently within the model's rate budget
+        texts = self.executor.map(
+            lambda pair: self.generate_texts(pair[1], drafts.get(pair[0], {})),
+            enumerate(new_products)
+        )
+
         enriched_products = []
-        for product in new_products:
+        failed_products = []
+        # Ids already in use, so two products never end up sharing one
+        taken_ids = {product_key(p) for p in self.catalog.products}
+        for product, image_job, (generated, error) in zip(new_products, image_jobs, texts):
+            if error is not None:
+                # Kept for the next run rather than saving placeholder text into the catalog
+                logger.error(f"Content generation failed for {product.get('name')}, queued for retry: {error}")
+                failed_products.append(product)
+                continue
             try:
                 # 1. Scrape/Download Image
-                image_path = self.process_image(product)
+                image_path = image_job.result()
                 
                 # 2. Generate Content
-                description = self.generate_description(product)
-                consensus = self.generate_consensus(product)
+                description, consensus = generated
                 
                 # 3. Construct Final Product Object
                 # We need to map the "mock" scanner fields to our schema
                 # Schema: id, name, brand, category, subCategory, weight, description, price, amazonLink, imageUrl, specs
                 
                 final_product = {
-                    "id": self.generate_id(product),
+                    "id": self.generate_id(product, taken_ids),
                     "name": product.get("name"),
                     "brand": product.get("brand"),
                     "category": product.get("category", "Uncategorized"),
@@ -57,34 +179,130 @@ class Builder:
                     "consensusReview": consensus # Adding this new field to schema
                 }
                 
+                taken_ids.add(final_product["id"])
                 enriched_products.append(final_product)
                 logger.info(f"Built page for: {product.get('name')}")
                 
             except Exception as e:
                 logger.error(f"Failed to build product {product.get('name')}: {e}")
 
-        # 4. Update Inventory
-        if enriched_products and not self.dry_run:
-            self.update_inventory(enriched_products)
+        return enriched_products, failed_products
 
     def process_image(self, product):
         """Downloads image to public/images/parts/ and returns relative path."""
-        # For mock products or simple links, we might just return a placeholder 
-        # or download if it's a real URL.
-        # Assuming product['imageUrl'] might exist from the scanner or not.
-        
-        if product.get("imageUrl"):
-            return product.get("imageUrl")
-        
-        # Mock behavior:
-        return "/images/parts/placeholder.png"
+        url = product.get("imageUrl")
+        if not url:
+            return PLACEHOLDER_IMAGE
+        if not url.startswith(("http://", "https://")):
+            # Already a site path
+            return url
+
+        try:
+            return self.images.store(url)
+        except ImageRejected as e:
+            logger.warning(f"Rejected image for {product.get('name')} ({e}); using placeholder.")
+            return PLACEHOLDER_IMAGE
+        except ImageUnavailable as e:
+            # Keep the remote URL; the image scripts can localize it later
+            logger.warning(f"Could not fetch image for {product.get('name')} ({e}); keeping remote URL.")
+            return url
+        except Exception as e:
+            logger.error(f"Image processing failed for {product.get('name')}: {e}")
+            return url
+
+    def image_files(self, products):
+        """Local files behind the products' /images/parts/ URLs."""
+        files = set()
+        for product in products:
+            url = product.get("imageUrl") or ""
+            if url.startswith("/images/parts/"):
+                files.add(self.images.images_dir / url[len("/images/parts/"):])
+        return files
 
-    def generate_description(self, product):
-        """Uses LLM to write a unique description."""
+    def needs_description(self, product):
+        return (product.get("description") or "") in DESCRIPTION_PLACEHOLDERS
+
+    def needs_consensus(self, product):
+        return (product.get("consensusReview") or "") in CONSENSUS_PLACEHOLDERS
+
+    def generate_batched(self, products):
+        """
+        Writes descriptions and consensus reviews for up to `batch_size` products per LLM call,
+        asking for a JSON array back. Returns {index in products: {"description", "consensusReview"}}
+        with only the fields that validated; anything missing is left to the per-item calls.
+        """
+        if not self.model:
+            return {}
+        pending = [i for i, p in enumerate(products) if self.needs_description(p) or self.needs_consensus(p)]
+        chunks = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        drafts = {}
+        for result, error in self.executor.map(lambda chunk: self.generate_batch(products, chunk), chunks):
+            if error is None:
+                drafts.update(result)
+        if pending:
+            complete = sum(1 for d in drafts.values() if len(d) == 2)
+            logger.info(f"Batched generation: {complete}/{len(pending)} products complete, rest fall back to single calls.")
+        return drafts
+
+    def generate_batch(self, products, indices):
+        """One batched LLM call for products[i] for i in indices."""
+        listing = "\n".join(
+            f'{i}. name: "{products[i].get("name")}", brand: "{products[i].get("brand")}", category: "{products[i].get("category")}"'
+            for i in indices
+        )
+        prompt = f"""
+        For each FPV drone product below, write two texts.
+        "description": a unique, engaging description. Focus on: What it is, Flight Characteristics, and Compatibility.
+        Tone: "Observant Professor" - knowledgeable tech engineering mixed with pilot reality. Max 50 words.
+        "consensusReview": based on general knowledge of FPV gear, a brutally honest logical consensus review.
+        Highlight pros and cons. If it has known issues (drift, fragile), state them. Max 3 sentences.
+
+        Products:
+        {listing}
+
+        Return ONLY a JSON array with one object per product, no prose:
+        [{{"index": <number from the list>, "description": "...", "consensusReview": "..."}}]
+        """
+        try:
+            response = self.model.generate_content(prompt)
+            items = parse_json_reply(response.text)
+        except Exception as e:
+            logger.warning(f"Batched generation failed for {len(indices)} products: {e}")
+            return {}
+        if not isinstance(items, list):
+            logger.warning("Batched generation returned something other than a JSON array.")
+            return {}
+
+        drafts = {}
+        for item in items:
+            if not isinstance(item, dict) or item.get("index") not in indices:
+                continue
+            draft = {}
+            for field, max_words in (("description", MAX_DESCRIPTION_WORDS), ("consensusReview", MAX_CONSENSUS_WORDS)):
+                text = item.get(field)
+                if isinstance(text, str) and text.strip() and len(text.split()) <= max_words:
+                    draft[field] = text.strip()
+            # A repeated index only fills in fields the first answer lacked
+            for field, text in draft.items():
+                drafts.setdefault(item["index"], {}).setdefault(field, text)
+        return drafts
+
+    def generate_texts(self, product, draft):
+        """(description, consensus) for a product; raises if the LLM could not produce them."""
+        return (
+            self.generate_description(product, draft.get("description")),
+            self.generate_consensus(product, draft.get("consensusReview")),
+        )
+
+    def generate_description(self, product, draft=None):
+        """Uses LLM to write a unique description (or takes one already drafted by a batch call)."""
         # Prefer pre-supplied description if available
-        if product.get("description") and product.get("description") != "No description available.":
+        if not self.needs_description(product):
             return product.get("description")
 
+        if draft:
+            return draft
+
         if not self.model:
             return product.get("description", "No description available.")
             
@@ -94,19 +312,19 @@ class Builder:
         Tone: "Observant Professor" - knowledgeable tech engineering mixed with pilot reality.
         Max 50 words.
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"LLM Generation failed: {e}")
-            return "Description generation failed."
+        # Errors propagate (after RateLimitedModel's retries) so the product is queued, not saved half-written
+        response = self.model.generate_content(prompt)
+        return response.text.strip()
 
-    def generate_consensus(self, product):
-        """Uses LLM to synthesize a consensus review."""
+    def generate_consensus(self, product, draft=None):
+        """Uses LLM to synthesize a consensus review (or takes one already drafted by a batch call)."""
         # Prefer pre-supplied review if available
-        if product.get("consensusReview") and product.get("consensusReview") != "Consensus review unavailable.":
+        if not self.needs_consensus(product):
             return product.get("consensusReview")
 
+        if draft:
+            return draft
+
         if not self.model:
             return "Consensus review unavailable."
 
@@ -118,29 +336,29 @@ class Builder:
         Highlight pros and cons. If it has known issues (drift, fragile), state them.
         Max 3 sentences.
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"LLM Generation failed: {e}")
-            return "Consensus generation failed."
+        response = self.model.generate_content(prompt)
+        return response.text.strip()
 
-    def generate_id(self, product):
-        """Generates a simple ID like 'brand-name-01'."""
+    def generate_id(self, product, taken=()):
+        """Generates a simple ID like 'brand-name-01', numbered ('-2', '-3', ...) if it is already taken."""
         slug = product.get("name", "").lower().replace(" ", "-")
-        return f"{slug[:20]}-{str(product.get('price'))[:2]}"
+        base = f"{slug[:20]}-{str(product.get('price'))[:2]}"
+        candidate = base
+        n = 2
+        while candidate in taken:
+            candidate = f"{base}-{n}"
+            n += 1
+        return candidate
 
     def update_inventory(self, new_items):
-        """Appends new items to products.json."""
+        """Appends new items to the catalog. Returns the items actually added."""
         try:
-            with open(PRODUCTS_FILE, 'r') as f:
-                data = json.load(f)
-            
-            data["products"].extend(new_items)
-            
-            with open(PRODUCTS_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
+            added = self.catalog.add(new_items)
+            if self.owns_catalog:
+                self.catalog.save()
             
-            logger.info(f"Inventory updated with {len(new_items)} new items.")
+            logger.info(f"Inventory updated with {len(added)} new items.")
+            return added
         except Exception as e:
             logger.error(f"Failed to update inventory: {e}")
+            return []
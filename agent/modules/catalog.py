@@ -0,0 +1,181 @@
+import json
+import logging
+from config import PRODUCTS_FILE, PRODUCTS_JOURNAL_COMPACT_BYTES
+from modules.atomic import atomic_write_text
+from modules.catalog_frame import CatalogFrame
+from modules.product_journal import ProductJournal, journal_path_for
+
+logger = logging.getLogger("FlightRiskAgent.Catalog")
+
+def product_key(product):
+    """Stable identity for a product record (id, falling back to name)."""
+    return product.get("id") or product.get("name")
+
+class ProductCatalog:
+    """
+    products.json, loaded once per agent run and shared by every phase.
+    Phases edit the records in place and report what they touched; save()
+    appends just those records to a write-ahead journal (products.json.journal),
+    and compact() folds the journal into products.json with an atomic rename,
+    on demand or once the journal outgrows `compact_bytes`. Loading replays
+    any journal left behind, so edits saved before a crash are never lost.
+
+    If products.json or its journal can't be read, `loaded` is False and nothing is
+    ever written back, so a corrupt file is never replaced by a partial catalog.
+    """
+    def __init__(self, path=PRODUCTS_FILE, compact_bytes=PRODUCTS_JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.journal = ProductJournal(journal_path_for(path))
+        self.compact_bytes = compact_bytes
+        self.data = {"products": []}
+        self.dirty_keys = set()
+        self.removed_keys = set()
+        self.loaded = False
+        self.load()
+
+    def load(self):
+        """(Re)reads the catalog and its journal from disk, discarding unsaved edits."""
+        self.loaded = False
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+            self.data.setdefault("products", [])
+        except FileNotFoundError:
+            logger.warning(f"No catalog at {self.path}; starting an empty one.")
+            self.data = {"products": []}
+        except Exception as e:
+            logger.error(f"Failed to load catalog {self.path}: {e}")
+            self.data = {"products": []}
+            return
+        if self.journal.size():
+            try:
+                self.data["products"], applied = self.journal.replay(self.products, product_key)
+                logger.info(f"Replayed {applied} journal entries over {self.path}.")
+            except Exception as e:
+                logger.error(f"Failed to replay catalog journal {self.journal.path}: {e}")
+                return
+        self.loaded = True
+        self.dirty_keys = set()
+        self.removed_keys = set()
+
+    @property
+    def products(self):
+        """The live list of product dicts."""
+        return self.data["products"]
+
+    @property
+    def dirty(self):
+        """True if there are edits not yet written to disk."""
+        return bool(self.dirty_keys or self.removed_keys)
+
+    def frame(self):
+        """Columnar snapshot of the products for bulk filtering (see modules/catalog_frame.py)."""
+        return CatalogFrame(self.products)
+
+    def mark_dirty(self, product):
+        """Records that a product was edited in place."""
+        self.dirty_keys.add(product_key(product))
+
+    def add(self, new_products):
+        """Appends new product records, refusing any whose key is already taken. Returns the ones added."""
+        taken = {product_key(p) for p in self.products}
+        added = []
+        for product in new_products:
+            key = product_key(product)
+            if not key or key in taken:
+                logger.error(f"Not adding {product.get('name')}: key {key!r} is already in the catalog")
+                continue
+            taken.add(key)
+            self.products.append(product)
+            self.mark_dirty(product)
+            added.append(product)
+        return added
+
+    def shared_keys(self):
+        """Keys carried by more than one record (only possible if products.json was edited by hand)."""
+        seen = set()
+        shared = set()
+        for product in self.products:
+            key = product_key(product)
+            if key in seen:
+                shared.add(key)
+            seen.add(key)
+        return shared
+
+    def remove(self, doomed):
+        """Removes the given product records."""
+        doomed_ids = {id(p) for p in doomed}
+        self.data["products"] = [p for p in self.products if id(p) not in doomed_ids]
+        for product in doomed:
+            key = product_key(product)
+            self.removed_keys.add(key)
+            self.dirty_keys.discard(key)
+
+    def _journal_edits(self):
+        records = {product_key(p): p for p in self.products}
+        upserts = {key: records[key] for key in self.dirty_keys if key in records}
+        try:
+            self.journal.append(upserts, self.removed_keys)
+            logger.info(f"Journaled {len(upserts)} updated and {len(self.removed_keys)} removed records.")
+            self.dirty_keys = set()
+            self.removed_keys = set()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to journal catalog edits to {self.journal.path}: {e}")
+            return False
+
+    def save(self):
+        """
+        Journals the changed and removed records if there are any, compacting when the
+        journal has grown past the threshold. Returns True if it wrote.
+        """
+        if not self.dirty:
+            logger.info("Catalog unchanged; nothing to save.")
+            return False
+        if not self._writable():
+            return False
+        if self.shared_keys():
+            # The journal addresses records by key; with duplicates it could not tell them apart
+            logger.warning("Catalog has duplicate product keys; rewriting products.json instead of journaling.")
+            return self._rewrite()
+        if not self._journal_edits():
+            return False
+        if self.journal.size() >= self.compact_bytes:
+            self.compact()
+        return True
+
+    def compact(self):
+        """
+        Journals pending edits, then rewrites products.json atomically from memory and
+        empties the journal. Replaying a journal over an already-compacted file is harmless,
+        so a crash between the two steps is safe. Returns True if products.json was rewritten.
+        """
+        if not self._writable():
+            return False
+        if self.dirty and self.shared_keys():
+            return self._rewrite()
+        if self.dirty and not self._journal_edits():
+            return False
+        if not self.journal.size():
+            return False
+        return self._rewrite()
+
+    def _writable(self):
+        if not self.loaded:
+            logger.error(f"Not writing {self.path}: it failed to load, so the catalog in memory is incomplete.")
+        return self.loaded
+
+    def _rewrite(self):
+        """The whole catalog from memory to products.json (temp file + rename), then an empty journal."""
+        if not self._writable():
+            return False
+        try:
+            atomic_write_text(self.path, json.dumps(self.data, indent=2))
+            self.journal.clear()
+            self.dirty_keys = set()
+            self.removed_keys = set()
+            logger.info(f"Wrote {self.path} ({len(self.products)} products); journal folded in.")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write catalog {self.path}: {e}")
+            return False
@@ -0,0 +1,138 @@
+import re
+import numpy as np
+
+# Placeholder images the site falls back to when a product has no real photo
+GENERIC_IMAGES = (
+    "/images/parts/generic-drone.png",
+    "/images/parts/generic-radio.png",
+    "/images/parts/generic-goggles.png",
+    "/images/parts/generic-vtx.png",
+    "/images/parts/generic-tool.png",
+    "/images/parts/generic-lipo.png",
+)
+
+_NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+_WEIGHT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(kg|g|lbs?|oz)?", re.IGNORECASE)
+_GRAMS_PER_UNIT = {"g": 1.0, "kg": 1000.0, "lb": 453.592, "lbs": 453.592, "oz": 28.3495}
+
+def parse_number(value):
+    """29.99, '29.99', '$1,299.00' -> float; anything unparseable -> nan."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER_PATTERN.search(value.replace(",", ""))
+        if match:
+            return float(match.group())
+    return np.nan
+
+def parse_weight_grams(value):
+    """'288g', '~ 68.0g', '283g±5g (excluding battery)', '0.04 lbs', '1.2kg' -> grams; 'N/A' -> nan."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return np.nan
+    # The first figure is the headline weight; later ones are tolerances or alternate configs
+    match = _WEIGHT_PATTERN.search(value)
+    if not match:
+        return np.nan
+    unit = (match.group(2) or "g").lower()
+    return float(match.group(1)) * _GRAMS_PER_UNIT[unit]
+
+class CatalogFrame:
+    """
+    Read-only columnar projection of the product list: numbers parsed once into float
+    arrays (nan when missing), categories as integer codes, and link/image state as
+    boolean masks. Predicates combine with & | ~ and run vectorized; `rows(mask)` maps
+    a mask back to the product dicts it selects.
+
+    Build a new frame after editing the catalog; it does not track changes.
+    """
+    def __init__(self, products):
+        self.products = list(products)
+        n = len(self.products)
+
+        self.price = np.full(n, np.nan)
+        self.rating = np.full(n, np.nan)
+        self.weight_g = np.full(n, np.nan)
+        category_codes = np.zeros(n, dtype=np.int32)
+        self.categories = []
+        codes = {}
+
+        amazon = np.zeros(n, dtype=bool)
+        amazon_search = np.zeros(n, dtype=bool)
+        getfpv = np.zeros(n, dtype=bool)
+        image = np.zeros(n, dtype=bool)
+        image_local = np.zeros(n, dtype=bool)
+        image_generic = np.zeros(n, dtype=bool)
+
+        # One pass over the dicts; everything after this is array work
+        for i, p in enumerate(self.products):
+            self.price[i] = parse_number(p.get("price"))
+            self.rating[i] = parse_number(p.get("reviews_rating"))
+            self.weight_g[i] = parse_weight_grams(p.get("weight") or (p.get("specs") or {}).get("Weight"))
+
+            category = p.get("category") or ""
+            if category not in codes:
+                codes[category] = len(self.categories)
+                self.categories.append(category)
+            category_codes[i] = codes[category]
+
+            link = p.get("amazonLink") or ""
+            amazon[i] = bool(link)
+            amazon_search[i] = "/s?k=" in link
+            getfpv[i] = bool(p.get("getfpvLink"))
+
+            img = p.get("imageUrl") or ""
+            image[i] = bool(img)
+            image_local[i] = img.startswith("/")
+            image_generic[i] = img in GENERIC_IMAGES
+
+        self.category_code = category_codes
+        self.has_amazon_link = amazon
+        self.amazon_is_search = amazon_search
+        self.has_getfpv_link = getfpv
+        self.has_image = image
+        self.image_is_local = image_local
+        self.image_is_generic = image_generic
+
+    def __len__(self):
+        return len(self.products)
+
+    def rows(self, mask):
+        """The product dicts selected by a boolean mask."""
+        return [self.products[i] for i in np.flatnonzero(mask)]
+
+    def codes_for(self, *categories):
+        return [self.categories.index(c) for c in categories if c in self.categories]
+
+    # --- Bulk predicates (all return boolean masks) ---
+
+    def rating_at_least(self, minimum):
+        """Rated at or above `minimum`; unrated rows are False."""
+        return self.rating >= minimum
+
+    def price_between(self, low=None, high=None):
+        """low <= price < high; either bound may be None. Unpriced rows are False."""
+        mask = ~np.isnan(self.price)
+        if low is not None:
+            mask &= self.price >= low
+        if high is not None:
+            mask &= self.price < high
+        return mask
+
+    def price_band(self, edges):
+        """Band index per row for sorted `edges` (0 = below edges[0]); -1 for unpriced rows."""
+        bands = np.digitize(self.price, edges)
+        bands[np.isnan(self.price)] = -1
+        return bands
+
+    def in_category(self, *categories):
+        return np.isin(self.category_code, self.codes_for(*categories))
+
+    def missing_link(self):
+        """No Amazon link (dead links are blanked by the Spider)."""
+        return ~self.has_amazon_link
+
+    def needs_image(self):
+        """No image, or only a generic placeholder."""
+        return ~self.has_image | self.image_is_generic
@@ -0,0 +1,108 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_BASE_BACKOFF_SECONDS, CIRCUIT_MAX_BACKOFF_SECONDS
+
+logger = logging.getLogger("FlightRiskAgent.HostHealth")
+
+# Responses that mean "slow down", not "this page is gone"
+THROTTLE_STATUSES = (429, 503)
+
+def host_of(url):
+    """The host key a URL is tracked under."""
+    return urlparse(url).netloc.lower()
+
+class HostHealthTracker:
+    """
+    Per-host circuit breaker shared by everything that makes outbound HTTP calls.
+    After `failure_threshold` consecutive timeouts or throttle responses the host's
+    circuit opens and calls are refused until a jittered exponential backoff expires.
+    Then a single trial request is let through (half-open): success closes the
+    circuit, failure re-opens it with a longer backoff.
+    """
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, base_backoff=CIRCUIT_BASE_BACKOFF_SECONDS, max_backoff=CIRCUIT_MAX_BACKOFF_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {"failures": 0, "trips": 0, "open_until": 0.0, "trial_in_flight": False}
+        return state
+
+    def allow(self, url):
+        """True if a request to this URL's host may go out now."""
+        with self._lock:
+            state = self._state(host_of(url))
+            if state["trips"] == 0:
+                return True
+            if time.monotonic() < state["open_until"] or state["trial_in_flight"]:
+                return False
+            # Backoff expired: let exactly one trial request through
+            state["trial_in_flight"] = True
+            return True
+
+    def retry_in(self, url):
+        """Seconds until the host's circuit will accept a trial request (0 if it is closed or due)."""
+        with self._lock:
+            state = self._state(host_of(url))
+            if state["trips"] == 0:
+                return 0.0
+            return max(0.0, state["open_until"] - time.monotonic())
+
+    def is_open(self, url):
+        """True while the host's circuit is open or half-open."""
+        with self._lock:
+            return self._state(host_of(url))["trips"] > 0
+
+    def record_success(self, url):
+        """A normal response (any status other than a throttle) closes the circuit."""
+        host = host_of(url)
+        with self._lock:
+            state = self._state(host)
+            if state["trips"]:
+                logger.info(f"Circuit closed for {host}")
+            state.update(failures=0, trips=0, open_until=0.0, trial_in_flight=False)
+
+    def record_error(self, url):
+        """
+        A request that got no answer (connection refused or reset, DNS, TLS). It does not count
+        against a closed circuit, but a half-open trial that ends this way must not stay
+        in flight forever, so it re-opens the circuit like any failed trial.
+        """
+        with self._lock:
+            trial = self._state(host_of(url))["trial_in_flight"]
+        if trial:
+            self.record_failure(url)
+
+    def record_failure(self, url, retry_after=None):
+        """Counts a timeout or throttle response; opens (or re-opens) the circuit at the threshold."""
+        host = host_of(url)
+        with self._lock:
+            state = self._state(host)
+            state["failures"] += 1
+            if state["trips"] and time.monotonic() < state["open_until"]:
+                # A straggler that was already in flight when the circuit opened; don't escalate
+                return
+            state["trial_in_flight"] = False
+            if state["failures"] < self.failure_threshold and not state["trips"]:
+                return
+
+            state["trips"] += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (state["trips"] - 1))
+            # Equal jitter: keep at least half the backoff, randomize the rest
+            backoff = backoff / 2 + random.uniform(0, backoff / 2)
+            if retry_after:
+                backoff = max(backoff, min(self.max_backoff, retry_after))
+            state["open_until"] = time.monotonic() + backoff
+            logger.warning(f"Circuit open for {host} after {state['failures']} failures; backing off {backoff:.0f}s")
+
+def parse_retry_after(response):
+    """Retry-After in seconds, if the server sent the numeric form."""
+    value = response.headers.get("Retry-After", "")
+    return float(value) if value.strip().isdigit() else None
@@ -1,16 +1,28 @@
-import json
 import logging
 import requests
 from pathlib import Path
-from config import PRODUCTS_FILE, AMAZON_TAG, USER_AGENT, GETFPV_AFFILIATE_ID
+from config import AMAZON_TAG, USER_AGENT, GETFPV_AFFILIATE_ID, MARKET_FEEDS, MARKET_MIN_RATING
+from modules.catalog import ProductCatalog
+from modules.product_index import ProductIndex
+from modules.market_sources import source_for, normalize_candidate
+from modules.seen_set import SeenSet
 import urllib.parse
 
 logger = logging.getLogger("FlightRiskAgent.Hunter")
 
 class Hunter:
-    def __init__(self, dry_run=False):
+    def __init__(self, dry_run=False, catalog=None, feeds=None, force_recheck=False, seen=None):
         self.dry_run = dry_run
+        # force_recheck re-evaluates every feed item instead of skipping ones already turned down
+        self.force_recheck = force_recheck
+        self.seen = seen or SeenSet()
+        # 'builtin', .jsonl/.csv vendor dumps and search page URLs (see modules/market_sources.py)
+        self.feeds = feeds or MARKET_FEEDS
         self.new_products_found = []
+        self.links_updated = 0
+        # Shared run-wide catalog from main.py; a standalone Hunter loads (and saves) its own
+        self.owns_catalog = catalog is None
+        self.catalog = catalog or ProductCatalog()
 
     def construct_amazon_url(self, product_name):
         """Constructs a standardized Amazon Search URL."""
@@ -37,22 +49,22 @@ class Hunter:
         """Main entry point for the Hunter module."""
         logger.info("Starting Market Scan...")
         
-        # 1. Scan Market (Simulated/Best Effort)
+        # 1. Scan Market (a lazy stream; candidates flow one at a time into gap analysis)
+        self.seen.refresh(self.catalog.products)
         potential_products = self.scan_market()
         
         # 2. Gap Analysis
         missing_products = self.gap_analysis(potential_products)
-        
-        # Load data for pruning
-        try:
-            with open(PRODUCTS_FILE, 'r') as f:
-                data = json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load products for pruning: {e}")
-            data = {"products": []}
+        if self.seen.hits:
+            logger.info(f"Skipped {self.seen.hits} feed items already stocked or turned down on earlier runs.")
+        if not self.dry_run:
+            self.seen.save()
             
         # 4. Prune dead products
-        self.prune_inventory(data)
+        self.prune_inventory()
+
+        if self.owns_catalog and not self.dry_run:
+            self.catalog.save()
 
         if missing_products:
             logger.info(f"Found {len(missing_products)} new products not in inventory.")
@@ -65,13 +77,66 @@ class Hunter:
 
     def scan_market(self):
         """
-        Scans external sources for new products.
+        Streams candidates from every configured feed through normalization,
+        the rating filter and link standardization. Nothing is collected into a list.
+        """
+        logger.info("Scanning for new releases...")
+        stream = self.read_feeds()
+        stream = self.unseen(stream)
+        stream = self.normalized(stream)
+        stream = self.well_rated(stream)
+        return self.with_standard_links(stream)
+
+    def read_feeds(self):
+        """Raw records from each feed in turn."""
+        for feed in self.feeds:
+            try:
+                source = source_for(feed, builtin=self.builtin_finds)
+            except ValueError as e:
+                logger.error(str(e))
+                continue
+            yield from source
+
+    def unseen(self, stream):
+        """Drops raw records the seen-set says were already evaluated."""
+        if self.force_recheck:
+            yield from stream
+            return
+        for raw in stream:
+            if not self.seen.seen(raw):
+                yield raw
+
+    def normalized(self, stream):
+        for raw in stream:
+            item = normalize_candidate(raw)
+            if item is not None:
+                yield item
+
+    def well_rated(self, stream):
+        """Drops candidates rated below MARKET_MIN_RATING (unrated vendor SKUs pass through)."""
+        for item in stream:
+            rating = item.get("reviews_rating")
+            if rating is not None and rating < MARKET_MIN_RATING:
+                self.seen.add(item)
+                continue
+            yield item
+
+    def with_standard_links(self, stream):
+        for item in stream:
+            # Search links are regenerated in the standard tagged form; direct product links from feeds are kept
+            if "/s?k=" in item.get("amazonLink", "") or not item.get("amazonLink"):
+                item["amazonLink"] = self.construct_amazon_url(item["name"])
+            if not item.get("getfpvLink"):
+                item["getfpvLink"] = self.construct_getfpv_url(item["name"])
+            yield item
+
+    def builtin_finds(self):
+        """
+        Built-in candidate list (the 'builtin' feed).
         NOTE: Real Amazon scraping is brittle. 
         This implementation simulates finding a list of 'trending' items 
         or parses a hypothetical search result.
         """
-        logger.info("Scanning for new releases...")
-        
         # In a real scenario, this would loop through categories and URLs.
         # For this agent's stability, we'll implement a pattern that *could* be real,
         # but defaulting to a safe list for the demo to ensure it runs.
@@ -556,31 +621,22 @@ class Hunter:
                 "reviews_rating": 4.4
             }
         ]
-        
-        # Force standard URL generation
-        for item in potential_finds:
-             if "name" in item:
-                 item["amazonLink"] = self.construct_amazon_url(item["name"])
-                 item["getfpvLink"] = self.construct_getfpv_url(item["name"])
-                 
         return potential_finds
 
     def gap_analysis(self, potential_products):
-        """Compares potential finds against products.json."""
+        """Compares potential finds against the catalog."""
         logger.info("Performing Gap Analysis...")
         
         try:
-            with open(PRODUCTS_FILE, 'r') as f:
-                data = json.load(f)
-            
-            existing_names = {p.get("name").lower() for p in data.get("products", [])}
+            products = self.catalog.products
+            existing_names = {p.get("name").lower() for p in products}
             
             # Sub-step: Replenish dead links for existing products
-            self.check_replenishment(potential_products, data)
+            self.check_replenishment(potential_products)
             
             # Smart link normalization
             existing_links = set()
-            for p in data.get("products", []):
+            for p in products:
                 l = p.get("amazonLink", "")
                 if "/s?k=" in l:
                     # For search links, keep the base query, distinct from others
@@ -590,6 +646,9 @@ class Hunter:
                     clean = l.split('?')[0]
                 existing_links.add(clean)
 
+            # Catches re-listings the exact checks miss ("Mobula6 2024" vs "Mobula 6 (2024)")
+            index = ProductIndex.from_products(products)
+
             missing = []
             for item in potential_products:
                 # Normalization for check
@@ -601,11 +660,13 @@ class Hunter:
                 else:
                     link = raw_link.split('?')[0]
                 
-                # Check for 4.0+ stars if rating is available
-                if item.get("reviews_rating", 0) < 4.0:
+                if name in existing_names or link in existing_links:
+                    logger.debug(f"Skipping existing item: {item.get('name')}")
+                    self.seen.add(item)
                     continue
 
-                if name not in existing_names and link not in existing_links:
+                duplicate = index.find_duplicate(item)
+                if duplicate is None:
                     logger.info(f"Gap identified: {item.get('name')}")
                     
                     # Tagging
@@ -613,8 +674,11 @@ class Hunter:
                     item["amazonLink"] = tagged_link
                     
                     missing.append(item)
+                    # Feeds repeat themselves too; later copies should match this one
+                    index.add(item)
                 else:
-                    logger.debug(f"Skipping existing item: {item.get('name')}")
+                    logger.debug(f"Skipping near-duplicate: {item.get('name')} ~ {duplicate.get('name')}")
+                    self.seen.add(item)
             
             return missing
 
@@ -622,58 +686,54 @@ class Hunter:
             logger.error(f"Error in gap analysis: {e}")
             return []
 
-    def check_replenishment(self, potential_products, products_data):
-        """Forces update of ALL products to use standardized URLs."""
-        logger.info("Force-updating all product links (Amazon + GetFPV)...")
+    def check_replenishment(self, potential_products):
+        """Brings every product's links to the standardized form, touching only records that differ."""
+        logger.info("Checking product links against the standard Amazon + GetFPV format...")
         
-        products = products_data.get("products", [])
-        updated_count = 0
+        products = self.catalog.products
+        updated_links = 0
+        updated_products = 0
         
         for product in products:
             name = product.get("name")
-            if name:
-                # Always regenerate/update the links to ensure compliance
-                new_amazon_link = self.construct_amazon_url(name)
-                new_getfpv_link = self.construct_getfpv_url(name)
-                
-                product["amazonLink"] = new_amazon_link
-                product["getfpvLink"] = new_getfpv_link
-                updated_count += 1
+            if not name:
+                continue
 
-        if updated_count > 0:
-            logger.info(f"Updated links for {updated_count} products.")
-            try:
-                with open(PRODUCTS_FILE, 'w') as f:
-                    json.dump(products_data, f, indent=2)
-                logger.info(f"Saved replenished links to {PRODUCTS_FILE}")
-            except Exception as e:
-                logger.error(f"Failed to save products file: {e}")
+            canonical = {
+                "amazonLink": self.construct_amazon_url(name),
+                "getfpvLink": self.construct_getfpv_url(name),
+            }
+            changed = [field for field, url in canonical.items() if product.get(field) != url]
+            if not changed:
+                continue
+
+            for field in changed:
+                product[field] = canonical[field]
+            self.catalog.mark_dirty(product)
+            updated_links += len(changed)
+            updated_products += 1
 
-    def prune_inventory(self, products_data):
+        self.links_updated = updated_links
+        if updated_links > 0:
+            logger.info(f"Updated {updated_links} links on {updated_products} products.")
+        else:
+            logger.info("All product links already standardized.")
+        return updated_links
+
+    def prune_inventory(self):
         """Removes products that have no valid Amazon link."""
         logger.info("Pruning dead inventory...")
         
-        original_count = len(products_data.get("products", []))
-        active_products = []
-        removed_products = []
-        
-        for product in products_data.get("products", []):
-            if product.get("amazonLink"):
-                active_products.append(product)
-            else:
-                removed_products.append(product.get("name"))
+        original_count = len(self.catalog.products)
+        frame = self.catalog.frame()
+        removed_products = frame.rows(frame.missing_link())
         
         if len(removed_products) > 0:
-            logger.info(f"Pruning {len(removed_products)} dead products: {', '.join(removed_products)}")
+            logger.info(f"Pruning {len(removed_products)} dead products: {', '.join(p.get('name') or '?' for p in removed_products)}")
             
             if not self.dry_run:
-                products_data["products"] = active_products
-                try:
-                    with open(PRODUCTS_FILE, 'w') as f:
-                        json.dump(products_data, f, indent=2)
-                    logger.info(f"Pruned inventory saved. Count: {original_count} -> {len(active_products)}")
-                except Exception as e:
-                    logger.error(f"Failed to save pruned inventory: {e}")
+                self.catalog.remove(removed_products)
+                logger.info(f"Pruned inventory. Count: {original_count} -> {len(self.catalog.products)}")
         else:
             logger.info("No dead products found to prune.")
 
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import requests
+from config import PARTS_IMAGES_DIR, USER_AGENT, IMAGE_MIN_DIMENSION, IMAGE_MAX_BYTES, IMAGE_FETCH_TIMEOUT, IMAGE_HASH_INDEX_FILE
+from modules.atomic import atomic_write_bytes, atomic_write_text
+from modules.host_health import HostHealthTracker, THROTTLE_STATUSES, parse_retry_after
+
+logger = logging.getLogger("FlightRiskAgent.Images")
+
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "gif": ".gif", "webp": ".webp"}
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+# Files this store wrote: their name already is their content hash
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{16}\.(png|jpg|gif|webp)$")
+
+class ImageUnavailable(Exception):
+    """The image could not be fetched right now (network, throttling, HTTP error)."""
+
+class ImageRejected(Exception):
+    """The URL served something that is not a usable product image."""
+
+def _jpeg_size(data):
+    # Walk the marker segments to the first start-of-frame, which carries the dimensions
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+def sniff_image(data):
+    """(format, width, height) from the header bytes of a PNG/JPEG/GIF/WebP, or None if it isn't one."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+    if data[:3] == b"\xff\xd8\xff":
+        size = _jpeg_size(data)
+        return ("jpeg",) + size if size else None
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        width, height = struct.unpack("<HH", data[6:10])
+        return "gif", width, height
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        chunk = data[12:16]
+        if chunk == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+            return "webp", width, height
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return "webp", width & 0x3FFF, height & 0x3FFF
+    return None
+
+class ImageStore:
+    """
+    Content-addressed product images in public/images/parts. Downloads are checked
+    (image content type, real image header, minimum dimensions), named by the SHA-256
+    of their bytes, and deduplicated: identical bytes already on disk, under any name,
+    are reused instead of written again. A content-addressed file is found by its name;
+    older hand-named files are looked up in a hash index kept in `hash_index_file`,
+    which only re-reads files whose size or mtime changed.
+    """
+    def __init__(self, images_dir=PARTS_IMAGES_DIR, min_dimension=IMAGE_MIN_DIMENSION, max_bytes=IMAGE_MAX_BYTES, dry_run=False,
+                 hash_index_file=IMAGE_HASH_INDEX_FILE, hosts=None):
+        self.images_dir = images_dir
+        self.hash_index_file = hash_index_file
+        self.min_dimension = min_dimension
+        self.max_bytes = max_bytes
+        self.dry_run = dry_run
+        self.timeout = IMAGE_FETCH_TIMEOUT
+        self.hosts = hosts or HostHealthTracker()
+        self.downloaded = 0
+        self.reused = 0
+        self._by_hash = None
+        # Names stored this run (also covers dry runs, which write nothing)
+        self._written = set()
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _legacy_index(self):
+        """sha256 -> file name for the hand-named images (built on first use from the persisted index)."""
+        with self._index_lock:
+            if self._by_hash is None:
+                self._by_hash = self._build_legacy_index()
+            return self._by_hash
+
+    def _build_legacy_index(self):
+        try:
+            with open(self.hash_index_file, 'r') as f:
+                known = json.load(f).get("files", {})
+        except FileNotFoundError:
+            known = {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable image hash index {self.hash_index_file}: {e}")
+            known = {}
+
+        files = {}
+        hashed = 0
+        if self.images_dir.exists():
+            for entry in sorted(os.scandir(self.images_dir), key=lambda e: e.name):
+                name = entry.name
+                if not entry.is_file() or CONTENT_ADDRESSED.match(name) or not name.lower().endswith(IMAGE_SUFFIXES):
+                    continue
+                stat = entry.stat()
+                cached = known.get(name)
+                if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+                    files[name] = cached
+                else:
+                    with open(entry.path, 'rb') as f:
+                        files[name] = [stat.st_size, stat.st_mtime_ns, hashlib.sha256(f.read()).hexdigest()]
+                    hashed += 1
+
+        if files != known:
+            try:
+                self.hash_index_file.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(self.hash_index_file, json.dumps({"files": files}))
+            except Exception as e:
+                logger.warning(f"Could not save image hash index: {e}")
+        if hashed:
+            logger.info(f"Hashed {hashed} new or changed images in {self.images_dir}")
+
+        index = {}
+        for name, (_, _, digest) in sorted(files.items()):
+            index.setdefault(digest, name)
+        return index
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    def download(self, url):
+        """The image bytes at url. Raises ImageUnavailable or ImageRejected."""
+        if not self.hosts.allow(url):
+            raise ImageUnavailable("host is backing off")
+        try:
+            response = self._session().get(url, timeout=self.timeout, stream=True)
+        except requests.Timeout:
+            self.hosts.record_failure(url)
+            raise ImageUnavailable("timed out")
+        except requests.RequestException as e:
+            self.hosts.record_error(url)
+            raise ImageUnavailable(str(e))
+        with response:
+            if response.status_code in THROTTLE_STATUSES:
+                self.hosts.record_failure(url, parse_retry_after(response))
+                raise ImageUnavailable(f"throttled ({response.status_code})")
+            self.hosts.record_success(url)
+            if response.status_code != 200:
+                raise ImageUnavailable(f"status {response.status_code}")
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type and not content_type.startswith("image/"):
+                raise ImageRejected(f"content type {content_type}")
+            data = bytearray()
+            try:
+                for chunk in response.iter_content(64 * 1024):
+                    data += chunk
+                    if len(data) > self.max_bytes:
+                        raise ImageRejected(f"larger than {self.max_bytes} bytes")
+            except requests.RequestException as e:
+                raise ImageUnavailable(str(e))
+        return bytes(data)
+
+    def store(self, url):
+        """
+        Fetches, validates and stores one image. Returns its public path ("/images/parts/<hash>.<ext>");
+        raises ImageUnavailable if the download failed, ImageRejected if it isn't a usable image.
+        """
+        data = self.download(url)
+        info = sniff_image(data)
+        if info is None:
+            raise ImageRejected("not a PNG/JPEG/GIF/WebP image")
+        fmt, width, height = info
+        if min(width, height) < self.min_dimension:
+            raise ImageRejected(f"too small ({width}x{height})")
+
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest[:16]}{EXTENSIONS[fmt]}"
+        # Same bytes stored by an earlier run: the name says so; otherwise maybe under an old hand-picked name
+        existing = name if (self.images_dir / name).exists() else self._legacy_index().get(digest)
+        with self._lock:
+            if existing or name in self._written:
+                self.reused += 1
+                return f"/images/parts/{existing or name}"
+            if not self.dry_run:
+                self.images_dir.mkdir(parents=True, exist_ok=True)
+                atomic_write_bytes(self.images_dir / name, data)
+            self._written.add(name)
+            self.downloaded += 1
+        logger.debug(f"Stored {url} as {name} ({width}x{height})")
+        return f"/images/parts/{name}"
@@ -0,0 +1,131 @@
+import sqlite3
+import logging
+import threading
+import time
+from config import LINK_HEALTH_DB, LINK_HEALTH_TTL_OK_HOURS, LINK_HEALTH_TTL_FAIL_HOURS
+
+logger = logging.getLogger("FlightRiskAgent.LinkHealth")
+
+class LinkHealthStore:
+    """
+    On-disk record of link check outcomes, keyed by URL.
+    Healthy and failing links get separate TTLs so dead links are re-verified
+    sooner than ones that passed recently.
+    Also keeps the ETag/Last-Modified validators of any URL the agent fetches
+    (links and images), so the next fetch can be a conditional request.
+    """
+    def __init__(self, db_path=LINK_HEALTH_DB, ttl_ok_hours=LINK_HEALTH_TTL_OK_HOURS, ttl_fail_hours=LINK_HEALTH_TTL_FAIL_HOURS):
+        self.db_path = db_path
+        self.ttl_ok = ttl_ok_hours * 3600
+        self.ttl_fail = ttl_fail_hours * 3600
+        self.hits = 0
+        self.misses = 0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Link checks run on a worker pool, so the connection is shared behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                alive INTEGER NOT NULL,
+                status_code INTEGER,
+                last_checked REAL NOT NULL,
+                consecutive_failures INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                updated REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        """Returns the stored record for a URL as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT alive, status_code, last_checked, consecutive_failures FROM links WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "url": url,
+            "alive": bool(row[0]),
+            "status_code": row[1],
+            "last_checked": row[2],
+            "consecutive_failures": row[3]
+        }
+
+    def is_due(self, record, now=None):
+        """True if the record is missing or older than its TTL."""
+        if record is None:
+            return True
+        now = now or time.time()
+        ttl = self.ttl_ok if record["alive"] else self.ttl_fail
+        return now - record["last_checked"] >= ttl
+
+    def lookup(self, url):
+        """Returns the cached verdict (True/False) if still fresh, otherwise None."""
+        record = self.get(url)
+        if self.is_due(record):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record["alive"]
+
+    def record(self, url, alive, status_code=None):
+        """Stores a fresh check result, counting consecutive failures."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO links (url, alive, status_code, last_checked, consecutive_failures)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    alive = excluded.alive,
+                    status_code = excluded.status_code,
+                    last_checked = excluded.last_checked,
+                    consecutive_failures = CASE WHEN excluded.alive THEN 0 ELSE links.consecutive_failures + 1 END
+            """, (url, int(bool(alive)), status_code, time.time(), 0 if alive else 1))
+            self._conn.commit()
+
+    def get_validators(self, url):
+        """Returns (etag, last_modified) from the last successful fetch of the URL, or (None, None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM validators WHERE url = ?", (url,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a revalidating request (empty if nothing stored)."""
+        etag, last_modified = self.get_validators(url)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def save_validators(self, url, etag, last_modified):
+        """Remembers a response's validators. Responses without any leave the stored ones alone."""
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO validators (url, etag, last_modified, updated) VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    updated = excluded.updated
+            """, (url, etag, last_modified, time.time()))
+            self._conn.commit()
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
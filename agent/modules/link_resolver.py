@@ -0,0 +1,173 @@
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+import requests
+from bs4 import BeautifulSoup
+from config import (
+    USER_AGENT, RESOLVED_LINKS_DB, RESOLVER_MAX_WORKERS, SPIDER_PER_HOST_CONCURRENCY,
+    RESOLVER_TTL_DAYS, RESOLVER_MISS_TTL_HOURS
+)
+from modules.host_health import HostHealthTracker, THROTTLE_STATUSES, parse_retry_after, host_of
+
+logger = logging.getLogger("FlightRiskAgent.Resolver")
+
+def is_search_url(url):
+    """True for the Amazon/GetFPV search links Hunter.construct_*_url builds."""
+    return bool(url) and (("amazon." in url and "/s?k=" in url) or "getfpv.com/catalogsearch" in url)
+
+def first_product_url(search_url, html):
+    """Canonical product page for the top organic result on a search page, or None."""
+    soup = BeautifulSoup(html, "html.parser")
+    if "amazon." in search_url:
+        for result in soup.select('div[data-component-type="s-search-result"][data-asin]'):
+            asin = result.get("data-asin", "").strip()
+            # Sponsored slots are ads, not the product the name describes
+            if asin and "AdHolder" not in (result.get("class") or []):
+                return f"https://www.amazon.com/dp/{asin}"
+        return None
+    link = soup.select_one("a.product-item-link")
+    if link and link.get("href"):
+        return urljoin(search_url, link["href"]).split("?")[0]
+    return None
+
+class LinkResolver:
+    """
+    Maps catalog search URLs to the product page they land on, so link checks and image
+    scrapers can fetch the (much lighter) product page instead of a search result page.
+    Mappings live in a small SQLite cache; found pages are trusted for `ttl_days`,
+    searches that found nothing are retried after `miss_ttl_hours`.
+    """
+    def __init__(self, db_path=RESOLVED_LINKS_DB, max_workers=RESOLVER_MAX_WORKERS, per_host=SPIDER_PER_HOST_CONCURRENCY,
+                 ttl_days=RESOLVER_TTL_DAYS, miss_ttl_hours=RESOLVER_MISS_TTL_HOURS, timeout=20, hosts=None):
+        self.db_path = db_path
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.ttl = ttl_days * 86400
+        self.miss_ttl = miss_ttl_hours * 3600
+        self.timeout = timeout
+        self.hosts = hosts or HostHealthTracker()
+        self.resolved = 0
+        self.missed = 0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS resolved (
+                search_url TEXT PRIMARY KEY,
+                product_url TEXT,
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._host_limits = {}
+        self._local = threading.local()
+
+    def _row(self, search_url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT product_url, resolved_at FROM resolved WHERE search_url = ?", (search_url,)
+            ).fetchone()
+
+    def cached(self, search_url):
+        """The cached product page for a search URL, or None (unknown, stale, or nothing found)."""
+        row = self._row(search_url)
+        if row and row[0] and time.time() - row[1] < self.ttl:
+            return row[0]
+        return None
+
+    def is_due(self, search_url):
+        row = self._row(search_url)
+        if row is None:
+            return True
+        ttl = self.ttl if row[0] else self.miss_ttl
+        return time.time() - row[1] >= ttl
+
+    def remember(self, search_url, product_url):
+        """Stores a mapping (product_url None records a search that found nothing)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolved (search_url, product_url, resolved_at) VALUES (?, ?, ?)",
+                (search_url, product_url, time.time())
+            )
+            self._conn.commit()
+
+    def forget(self, search_url):
+        """Drops a mapping, e.g. when its product page has gone away."""
+        with self._lock:
+            self._conn.execute("DELETE FROM resolved WHERE search_url = ?", (search_url,))
+            self._conn.commit()
+
+    def _session(self):
+        # requests.Session is not thread-safe; one per worker thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    def _host_limit(self, url):
+        with self._lock:
+            host = host_of(url)
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def resolve(self, search_url):
+        """Fetches one search page and caches where it leads. Returns the product URL or None."""
+        if not self.hosts.allow(search_url):
+            return None
+        try:
+            with self._host_limit(search_url):
+                response = self._session().get(search_url, timeout=self.timeout)
+        except requests.Timeout:
+            self.hosts.record_failure(search_url)
+            return None
+        except requests.RequestException as e:
+            logger.debug(f"Could not resolve {search_url}: {e}")
+            self.hosts.record_error(search_url)
+            return None
+
+        if response.status_code in THROTTLE_STATUSES:
+            self.hosts.record_failure(search_url, parse_retry_after(response))
+            return None
+        self.hosts.record_success(search_url)
+        if response.status_code != 200:
+            logger.debug(f"Search page {search_url} returned {response.status_code}")
+            return None
+
+        product_url = first_product_url(search_url, response.text)
+        self.remember(search_url, product_url)
+        with self._lock:
+            if product_url:
+                self.resolved += 1
+            else:
+                self.missed += 1
+        return product_url
+
+    def resolve_all(self, urls):
+        """Resolves every search URL whose cache entry is missing or stale, concurrently."""
+        due = sorted({url for url in urls if is_search_url(url) and self.is_due(url)})
+        if not due:
+            logger.info("Search link mappings are all fresh.")
+            return
+        logger.info(f"Resolving {len(due)} search links to product pages...")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="resolver") as pool:
+            list(pool.map(self.resolve, due))
+        logger.info(f"Resolved {self.resolved} search links; {self.missed} found no product; "
+                    f"{len(due) - self.resolved - self.missed} could not be fetched.")
+
+    def resolve_catalog(self, products):
+        """Resolve stage for the maintenance phase: every Amazon and GetFPV search link in the catalog."""
+        urls = []
+        for product in products:
+            urls.extend(product.get(field) for field in ("amazonLink", "getfpvLink"))
+        self.resolve_all(url for url in urls if url)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from config import LLM_CACHE_DB, LLM_CACHE_MAX_MB, LLM_CACHE_MAX_AGE_DAYS, LLM_CACHE_BYPASS
+
+logger = logging.getLogger("FlightRiskAgent.LLMCache")
+
+def cache_key(model_name, prompt, params=None):
+    """Content address of a request: identical model + prompt + generation params share a key."""
+    payload = json.dumps({"model": model_name, "prompt": prompt, "params": params or {}}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class CachedResponse:
+    """Stands in for a generate_content response; callers only read .text."""
+    def __init__(self, text):
+        self.text = text
+
+class LLMCache:
+    """
+    On-disk memo of LLM replies, so re-running a failed build or a dry run does not pay
+    for the same prompts again. Entries expire after `max_age_days`; past `max_mb` the
+    least recently used ones are evicted. SQLite in WAL mode with a busy timeout and
+    IMMEDIATE write transactions keeps it safe with several agent processes at once.
+
+    With `bypass` set, lookups always miss (every prompt goes to the model) but fresh
+    replies are still stored.
+    """
+    def __init__(self, db_path=LLM_CACHE_DB, max_mb=LLM_CACHE_MAX_MB, max_age_days=LLM_CACHE_MAX_AGE_DAYS, bypass=LLM_CACHE_BYPASS):
+        self.db_path = db_path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age = max_age_days * 86400
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; write transactions are opened explicitly below
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, model_name, prompt, params=None):
+        """The cached reply text, or None."""
+        key = cache_key(model_name, prompt, params)
+        now = time.time()
+        with self._lock:
+            row = None if self.bypass else self._conn.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] < self.max_age:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, model_name, prompt, params, text):
+        """Stores a reply and evicts whatever the age and size limits now exclude."""
+        if not text:
+            return
+        key = cache_key(model_name, prompt, params)
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, text, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_name, text, len(text.encode("utf-8")), now, now)
+                )
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                # BEGIN IMMEDIATE itself can time out on a busy database, leaving nothing to roll back
+                if self._conn.in_transaction:
+                    try:
+                        self._conn.execute("ROLLBACK")
+                    except Exception:
+                        pass
+                logger.warning(f"Could not cache LLM reply: {e}")
+
+    def _evict(self, now):
+        expired = self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,)).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        over = total - self.max_bytes
+        lru = 0
+        if over > 0:
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                if over <= 0:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                over -= size
+                lru += 1
+        self.evicted += expired + lru
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses, {self.evicted} evicted"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class CachedModel:
+    """Wraps a genai.GenerativeModel so generate_content goes through an LLMCache first."""
+    def __init__(self, model, model_name, cache):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        if kwargs.get("stream"):
+            # Streaming callers want the live chunks; nothing to replay from cache
+            return self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
+        params = {"generation_config": generation_config, **kwargs}
+        # The cache is an optimization: a locked or broken database must never cost us a reply
+        try:
+            text = self.cache.get(self.model_name, prompt, params)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            text = None
+        if text is not None:
+            return CachedResponse(text)
+        response = self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
+        try:
+            self.cache.put(self.model_name, prompt, params, response.text)
+        except Exception as e:
+            logger.warning(f"Could not cache LLM reply: {e}")
+        return response
@@ -0,0 +1,112 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core import exceptions as google_exceptions
+from config import (
+    GEMINI_MODEL_FAST, GEMINI_MODEL_SMART, LLM_MAX_WORKERS, LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS, LLM_OUTPUT_TOKEN_ESTIMATE,
+    LLM_RPM_FAST, LLM_TPM_FAST, LLM_RPM_SMART, LLM_TPM_SMART
+)
+
+logger = logging.getLogger("FlightRiskAgent.LLM")
+
+# Errors worth another attempt: quota/rate limits, overload, timeouts, dropped connections
+TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Per-model budgets (requests/minute, tokens/minute)
+MODEL_BUDGETS = {
+    GEMINI_MODEL_FAST: (LLM_RPM_FAST, LLM_TPM_FAST),
+    GEMINI_MODEL_SMART: (LLM_RPM_SMART, LLM_TPM_SMART),
+}
+
+def estimate_tokens(prompt):
+    """Rough request cost: ~4 characters per prompt token plus a typical reply."""
+    return len(str(prompt)) // 4 + LLM_OUTPUT_TOKEN_ESTIMATE
+
+class TokenBucket:
+    """Refills at `per_minute` units a minute up to one minute's worth; acquire() blocks until enough is in."""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # A single request bigger than the whole bucket still goes through once it is full
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def buckets_for(model_name):
+    """The process-wide (requests, tokens) buckets for a model, so every caller shares one budget."""
+    with _buckets_lock:
+        if model_name not in _buckets:
+            rpm, tpm = MODEL_BUDGETS.get(model_name, (LLM_RPM_FAST, LLM_TPM_FAST))
+            _buckets[model_name] = (TokenBucket(rpm), TokenBucket(tpm))
+        return _buckets[model_name]
+
+class RateLimitedModel:
+    """
+    Wraps a genai.GenerativeModel: every call first takes a request and its estimated tokens
+    from the model's budget, and transient errors are retried with capped exponential
+    backoff and full jitter. The last error is re-raised once retries run out.
+    """
+    def __init__(self, model, model_name, max_retries=LLM_MAX_RETRIES):
+        self.model = model
+        self.model_name = model_name
+        self.max_retries = max_retries
+        self.requests, self.tokens = buckets_for(model_name)
+
+    def generate_content(self, prompt, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire(1)
+            self.tokens.acquire(estimate_tokens(prompt))
+            try:
+                return self.model.generate_content(prompt, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+                logger.warning(f"{self.model_name} call failed ({type(e).__name__}: {e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+class LLMExecutor:
+    """Runs LLM-bound work on a thread pool; the per-model buckets keep it inside the quota."""
+    def __init__(self, max_workers=LLM_MAX_WORKERS):
+        self.max_workers = max(1, max_workers)
+
+    def map(self, fn, items):
+        """Calls fn on each item concurrently. Returns [(result, error)] in input order; error is None on success."""
+        def guarded(item):
+            try:
+                return fn(item), None
+            except Exception as e:
+                return None, e
+
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)), thread_name_prefix="llm") as pool:
+            return list(pool.map(guarded, items))
@@ -0,0 +1,139 @@
+import re
+from collections import namedtuple
+
+# One link occurrence in a markdown document. start/end are offsets into the source text.
+# kind: "inline" [text](url), "image" ![text](url), "reference" [text][label] / [label],
+# or "definition" for the [label]: url line itself (text is the label).
+MarkdownLink = namedtuple("MarkdownLink", ["start", "end", "kind", "text", "url", "label"])
+
+# [anchor] with no nested brackets, optionally preceded by ! for images
+ANCHOR_PATTERN = re.compile(r'(!?)\[([^\[\]\n]+)\]')
+# [label]: url "optional title"  (a whole line, newline included so removal leaves no gap)
+DEFINITION_PATTERN = re.compile(
+    r'^ {0,3}\[([^\[\]\n]+)\]:[ \t]*<?(https?://[^\s>]+)>?'
+    r'(?:[ \t]+(?:"[^"\n]*"|\'[^\'\n]*\'|\([^)\n]*\)))?[ \t]*(?:\n|$)',
+    re.MULTILINE
+)
+# Fenced code blocks are never scanned for links
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,}).*?^ {0,3}\1[^\n]*$', re.MULTILINE | re.DOTALL)
+
+def normalize_label(label):
+    """Reference labels are case-insensitive and whitespace-collapsed."""
+    return " ".join(label.split()).lower()
+
+def parse_destination(content, pos):
+    """
+    Parses an inline link destination starting just after '('.
+    Supports <bracketed> URLs, balanced parentheses inside bare URLs and an optional title.
+    Returns (url, end) where end is the offset after the closing ')', or None.
+    """
+    n = len(content)
+    while pos < n and content[pos] in " \t":
+        pos += 1
+
+    if pos < n and content[pos] == "<":
+        close = content.find(">", pos + 1)
+        if close == -1 or "\n" in content[pos:close]:
+            return None
+        url = content[pos + 1:close]
+        pos = close + 1
+    else:
+        start = pos
+        depth = 0
+        while pos < n:
+            c = content[pos]
+            if c.isspace():
+                break
+            if c == "(":
+                depth += 1
+            elif c == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            pos += 1
+        url = content[start:pos]
+
+    # Optional "title", 'title' or (title)
+    while pos < n and content[pos] in " \t":
+        pos += 1
+    if pos < n and content[pos] in "\"'(":
+        closer = ")" if content[pos] == "(" else content[pos]
+        close = content.find(closer, pos + 1)
+        if close == -1:
+            return None
+        pos = close + 1
+        while pos < n and content[pos] in " \t":
+            pos += 1
+
+    if pos >= n or content[pos] != ")" or not url:
+        return None
+    return url, pos + 1
+
+def extract_links(content):
+    """Finds every external (http/https) markdown link in one pass, with source offsets."""
+    skip = [(m.start(), m.end()) for m in FENCE_PATTERN.finditer(content)]
+
+    def skipped(offset):
+        return any(start <= offset < end for start, end in skip)
+
+    links = []
+    definitions = {}
+    for m in DEFINITION_PATTERN.finditer(content):
+        if skipped(m.start()):
+            continue
+        label = normalize_label(m.group(1))
+        # First definition of a label wins, as in CommonMark
+        definitions.setdefault(label, m.group(2))
+        links.append(MarkdownLink(m.start(), m.end(), "definition", m.group(1), m.group(2), label))
+    definition_spans = [(link.start, link.end) for link in links]
+
+    pos = 0
+    while True:
+        m = ANCHOR_PATTERN.search(content, pos)
+        if not m:
+            break
+        pos = m.end()
+        if skipped(m.start()) or any(start <= m.start() < end for start, end in definition_spans):
+            continue
+
+        is_image, text = m.group(1) == "!", m.group(2)
+        nxt = content[m.end():m.end() + 1]
+
+        if nxt == "(":
+            parsed = parse_destination(content, m.end() + 1)
+            if parsed and re.match(r'https?://', parsed[0]):
+                url, pos = parsed
+                links.append(MarkdownLink(m.start(), pos, "image" if is_image else "inline", text, url, None))
+            continue
+
+        # Reference-style: [text][label], [text][] or the [label] shortcut
+        label, end = normalize_label(text), m.end()
+        if nxt == "[":
+            close = content.find("]", m.end() + 1)
+            if close != -1 and "\n" not in content[m.end():close]:
+                label = normalize_label(content[m.end() + 1:close]) or label
+                end = close + 1
+        if label in definitions:
+            pos = end
+            links.append(MarkdownLink(m.start(), end, "reference", text, definitions[label], label))
+
+    links.sort(key=lambda link: link.start)
+    return links
+
+def link_matches(links):
+    """(anchor, url) pairs for the links a reader can click, i.e. everything but [label]: url definitions."""
+    return [(link.text, link.url) for link in links if link.kind != "definition"]
+
+def rewrite_links(content, edits):
+    """
+    Applies (start, end, replacement) edits in a single linear pass.
+    Edits must not overlap; everything outside them is copied through untouched.
+    """
+    pieces = []
+    pos = 0
+    for start, end, replacement in sorted(edits):
+        pieces.append(content[pos:start])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(content[pos:])
+    return "".join(pieces)
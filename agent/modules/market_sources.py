@@ -0,0 +1,167 @@
+import csv
+import json
+import logging
+from pathlib import Path
+from urllib.parse import urljoin
+import requests
+from bs4 import BeautifulSoup
+from config import USER_AGENT
+
+logger = logging.getLogger("FlightRiskAgent.MarketSources")
+
+# Vendor feeds name the same fields differently; map them onto products.json keys
+FIELD_ALIASES = {
+    "title": "name",
+    "product_name": "name",
+    "manufacturer": "brand",
+    "vendor": "brand",
+    "rating": "reviews_rating",
+    "stars": "reviews_rating",
+    "image": "imageUrl",
+    "image_url": "imageUrl",
+    "amazon_url": "amazonLink",
+    "getfpv_url": "getfpvLink",
+    "sub_category": "subCategory",
+}
+
+class MarketSource:
+    """
+    A stream of raw product candidates. Subclasses implement `candidates()` as a
+    generator so a feed is never held in memory as a whole.
+    """
+    name = "source"
+
+    def candidates(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        count = 0
+        try:
+            for raw in self.candidates():
+                count += 1
+                yield raw
+        except Exception as e:
+            logger.error(f"Market source {self.name} failed after {count} candidates: {e}")
+        else:
+            logger.info(f"Market source {self.name}: {count} candidates")
+
+class BuiltinSource(MarketSource):
+    """The hand-curated list that ships with the Hunter."""
+    name = "builtin"
+
+    def __init__(self, load):
+        self.load = load  # callable, so the list is only built when the stream starts
+
+    def candidates(self):
+        yield from self.load()
+
+class JsonlFeedSource(MarketSource):
+    """Vendor dump with one JSON object per line."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+
+    def candidates(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"{self.name}:{line_no}: skipping bad JSON ({e})")
+
+class CsvFeedSource(MarketSource):
+    """Vendor dump as CSV with a header row."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+
+    def candidates(self):
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+class SearchPageSource(MarketSource):
+    """
+    Scrapes a storefront search/category page (GetFPV-style Magento product grid),
+    following "next" links page by page up to `max_pages`.
+    """
+    def __init__(self, url, max_pages=5, timeout=20):
+        self.url = url
+        self.name = url
+        self.max_pages = max_pages
+        self.timeout = timeout
+
+    def candidates(self):
+        url = self.url
+        with requests.Session() as session:
+            session.headers["User-Agent"] = USER_AGENT
+            for _ in range(self.max_pages):
+                response = session.get(url, timeout=self.timeout)
+                if response.status_code != 200:
+                    logger.warning(f"Search page {url} returned {response.status_code}")
+                    return
+                soup = BeautifulSoup(response.text, "html.parser")
+                for tile in soup.select(".product-item"):
+                    link = tile.select_one(".product-item-link")
+                    if not link:
+                        continue
+                    price = tile.select_one("[data-price-amount]")
+                    img = tile.select_one("img.product-image-photo")
+                    yield {
+                        "name": link.get_text(" ", strip=True),
+                        "getfpvLink": urljoin(url, link.get("href", "")),
+                        "price": price.get("data-price-amount") if price else None,
+                        "imageUrl": img.get("src") if img else None,
+                    }
+                next_link = soup.select_one("a.next")
+                if not next_link or not next_link.get("href"):
+                    return
+                url = urljoin(url, next_link["href"])
+
+def source_for(spec, builtin=None):
+    """Picks a source for a feed spec: 'builtin', an http(s) search URL, or a .jsonl/.csv path."""
+    spec = spec.strip()
+    if spec == "builtin":
+        return BuiltinSource(builtin or list)
+    if spec.startswith(("http://", "https://")):
+        return SearchPageSource(spec)
+    suffix = Path(spec).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return JsonlFeedSource(spec)
+    if suffix == ".csv":
+        return CsvFeedSource(spec)
+    raise ValueError(f"Don't know how to read market feed: {spec}")
+
+def _to_float(value):
+    if value in (None, ""):
+        return None
+    try:
+        return float(str(value).replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+def normalize_candidate(raw):
+    """Maps a raw feed record onto the products.json shape; None if it has no usable name."""
+    item = {}
+    for key, value in raw.items():
+        if key is None:
+            continue  # CSV rows with more cells than headers
+        key = FIELD_ALIASES.get(key.strip(), key.strip())
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ""):
+            continue
+        item.setdefault(key, value)
+
+    if not item.get("name"):
+        return None
+    for key in ("price", "reviews_rating"):
+        if key in item:
+            number = _to_float(item[key])
+            if number is None:
+                del item[key]
+            else:
+                item[key] = number
+    return item
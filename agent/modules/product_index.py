@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import re
+import struct
+from functools import lru_cache
+from config import NEAR_DUPLICATE_THRESHOLD
+
+logger = logging.getLogger("FlightRiskAgent.ProductIndex")
+
+# Filler words that vary between listings of the same product
+STOP_TOKENS = {"the", "and", "with", "w", "for", "a", "of", "new", "edition", "version"}
+# Brands that say nothing about identity (resellers, unknown makers)
+GENERIC_BRANDS = {"", "generic", "unknown", "other"}
+# Specs that pin down a variant: if both sides list one and it differs, they are different products
+KEY_SPECS = ("KV", "Size", "Capacity", "Model", "Wheelbase", "Protocol")
+
+# One 64-byte digest per shingle yields all 32 MinHash values at once (as 16-bit lanes)
+NUM_PERM = 32
+_LANES = struct.Struct(f">{NUM_PERM}H")
+_SPLIT_PATTERN = re.compile(r"(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])")
+_TOKEN_PATTERN = re.compile(r"[a-z]+|\d+")
+
+def normalize_tokens(text):
+    """'HappyModel Mobula6 (2024)' -> ['happymodel', 'mobula', '6', '2024']"""
+    text = (text or "").lower().replace("&", " and ")
+    text = _SPLIT_PATTERN.sub(" ", text)
+    return [t for t in _TOKEN_PATTERN.findall(text) if t not in STOP_TOKENS]
+
+def shingles(tokens, n=3):
+    """Word tokens plus character n-grams of the joined name, so 'Mobula6' and 'Mobula 6' overlap fully."""
+    compact = "".join(tokens)
+    grams = {compact[i:i + n] for i in range(max(1, len(compact) - n + 1))}
+    return grams | set(tokens)
+
+@lru_cache(maxsize=1 << 16)
+def _shingle_hashes(value):
+    # hash() is salted per process; signatures need to be stable. Trigrams repeat a lot, hence the cache.
+    return _LANES.unpack(hashlib.blake2b(value.encode("utf-8"), digest_size=64).digest())
+
+class ProductIndex:
+    """
+    Near-duplicate lookup over product names, brands and key specs.
+    Exact normalized-token fingerprints are a dict hit; everything else goes through
+    MinHash signatures bucketed by LSH bands, so a query only compares against the few
+    entries that share a band instead of the whole catalog. Candidates are confirmed by
+    exact Jaccard similarity, matching model numbers, brand and key specs.
+    """
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, bands=8):
+        if NUM_PERM % bands:
+            raise ValueError(f"bands must divide {NUM_PERM}")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self._entries = []
+        self._fingerprints = {}
+        self._buckets = {}
+
+    @classmethod
+    def from_products(cls, products, **kwargs):
+        index = cls(**kwargs)
+        for product in products:
+            index.add(product)
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _describe(self, product):
+        brand = " ".join(normalize_tokens(product.get("brand")))
+        tokens = normalize_tokens(product.get("name"))
+        # Some feeds leave the brand out of the name; index both so either form matches
+        for t in brand.split():
+            if t not in tokens:
+                tokens.append(t)
+        specs = {}
+        for key in KEY_SPECS:
+            value = (product.get("specs") or {}).get(key)
+            if value:
+                specs[key] = " ".join(normalize_tokens(str(value)))
+        return {
+            "product": product,
+            "brand": "" if brand in GENERIC_BRANDS else brand,
+            "numbers": {t for t in tokens if t.isdigit()},
+            "fingerprint": " ".join(sorted(set(tokens))),
+            "shingles": shingles(tokens),
+            "specs": specs,
+        }
+
+    def _signature(self, grams):
+        # Column-wise minimum over every shingle's hash lanes
+        return [min(lane) for lane in zip(*map(_shingle_hashes, grams))]
+
+    def _band_keys(self, entry):
+        # Model numbers must match exactly anyway, so they are part of the bucket key;
+        # templated feed names ("Part 1 X1", "Part 2 X2", ...) then never pile into one bucket
+        numbers = tuple(sorted(entry["numbers"]))
+        signature = self._signature(entry["shingles"])
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (band, numbers, tuple(signature[start:start + self.rows]))
+
+    def add(self, product):
+        """Indexes a product so later lookups can match it."""
+        entry = self._describe(product)
+        if not entry["fingerprint"]:
+            return
+        slot = len(self._entries)
+        self._entries.append(entry)
+        self._fingerprints.setdefault(entry["fingerprint"], []).append(slot)
+        for key in self._band_keys(entry):
+            self._buckets.setdefault(key, []).append(slot)
+
+    def _compatible(self, a, b):
+        # Model numbers are where 'Mobula6' vs 'Mobula7' and 'Avata' vs 'Avata 2' differ
+        if a["numbers"] != b["numbers"]:
+            return False
+        if a["brand"] and b["brand"] and a["brand"] != b["brand"]:
+            return False
+        for key in a["specs"].keys() & b["specs"].keys():
+            if a["specs"][key] != b["specs"][key]:
+                return False
+        return True
+
+    def find_duplicate(self, product):
+        """The indexed product this one is a near-duplicate of, or None."""
+        query = self._describe(product)
+        if not query["fingerprint"]:
+            return None
+
+        for slot in self._fingerprints.get(query["fingerprint"], []):
+            if self._compatible(query, self._entries[slot]):
+                return self._entries[slot]["product"]
+
+        seen = set()
+        best, best_score = None, self.threshold
+        for key in self._band_keys(query):
+            for slot in self._buckets.get(key, []):
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                entry = self._entries[slot]
+                if not self._compatible(query, entry):
+                    continue
+                overlap = len(query["shingles"] & entry["shingles"])
+                score = overlap / len(query["shingles"] | entry["shingles"])
+                if score >= best_score:
+                    best, best_score = entry["product"], score
+        return best
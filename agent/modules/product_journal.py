@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+
+logger = logging.getLogger("FlightRiskAgent.Journal")
+
+def journal_path_for(catalog_path):
+    """products.json -> products.json.journal, alongside the catalog it belongs to."""
+    return catalog_path.with_name(catalog_path.name + ".journal")
+
+class ProductJournal:
+    """
+    Write-ahead log of catalog edits. Each save appends one JSON line holding that save's
+    deletes and upserts (whole product records), flushed and fsynced before it returns, so
+    a run that dies afterwards loses nothing and one that dies mid-append leaves only a
+    torn line, which replay skips. Compaction folds the log into products.json and
+    empties it (see ProductCatalog.compact).
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def size(self):
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, upserts, deletes):
+        """Durably records one batch of edits: {key: product} upserts and a list of deleted keys."""
+        entry = {"ts": time.time(), "delete": sorted(deletes), "upsert": upserts}
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with open(self.path, 'ab') as f:
+            # Start on a fresh line if an earlier append was cut off mid-line
+            if f.tell() and not self._ends_with_newline():
+                line = "\n" + line
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def entries(self):
+        """The recorded batches, oldest first, skipping torn lines."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn append was never acknowledged to its caller, so dropping it is correct
+                    logger.warning(f"Ignoring incomplete journal entry at {self.path}:{number}")
+                    continue
+                yield entry
+
+    def replay(self, products, key):
+        """
+        Applies every batch to a product list in order. Returns (products, batches applied).
+        Rows are never merged: an upsert or delete touches exactly one row with its key, so
+        records that happen to share a key in products.json all survive the replay.
+        """
+        rows = list(products)
+        slots = defaultdict(list)
+        for i, product in enumerate(rows):
+            slots[key(product)].append(i)
+        shared = sorted(str(k) for k, positions in slots.items() if len(positions) > 1)
+        if shared:
+            logger.warning(f"{len(shared)} keys are shared by several products ({', '.join(shared[:5])}); journal edits apply to the first of each")
+
+        applied = 0
+        for entry in self.entries():
+            for k in entry.get("delete", []):
+                if slots.get(k):
+                    rows[slots[k].pop(0)] = None
+            for k, product in entry.get("upsert", {}).items():
+                if slots.get(k):
+                    rows[slots[k][0]] = product
+                else:
+                    slots[k].append(len(rows))
+                    rows.append(product)
+            applied += 1
+        return [p for p in rows if p is not None], applied
+
+    def clear(self):
+        """Empties the log once its batches are folded into the catalog file."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
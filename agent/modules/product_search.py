@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import defaultdict
+from config import PRODUCT_SEARCH_INDEX_FILE
+from modules.atomic import atomic_write_text
+from modules.catalog import product_key
+
+logger = logging.getLogger("FlightRiskAgent.Search")
+
+INDEX_VERSION = 1
+
+# Field weights (BM25F-style: a term in the name counts three times one in the description)
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "subCategory": 2.0, "description": 1.0, "specs": 1.0}
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "vs", "why", "with", "your",
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Lowercase word tokens without stop words; a trailing plural 's' is dropped ("LiPos" -> "lipo")."""
+    tokens = []
+    for word in _WORD_PATTERN.findall(str(text).lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def field_text(product, field):
+    value = product.get(field)
+    if isinstance(value, dict):
+        return " ".join(f"{k} {v}" for k, v in value.items())
+    return value or ""
+
+def document_terms(product):
+    """Weighted term frequencies for one product across the indexed fields."""
+    terms = defaultdict(float)
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(field_text(product, field)):
+            terms[token] += weight
+    return dict(terms)
+
+def fields_hash(product):
+    payload = json.dumps({field: product.get(field) for field in FIELD_WEIGHTS}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class ProductSearchIndex:
+    """
+    BM25 inverted index over product name, category, subCategory, description and specs,
+    persisted between runs. sync() re-tokenizes only the products whose indexed fields
+    changed (by content hash) and drops removed ones; search() scores just the postings
+    of the query terms instead of scanning the catalog.
+    """
+    def __init__(self, path=PRODUCT_SEARCH_INDEX_FILE, k1=1.2, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.docs = {}
+        self.dirty = False
+        self._postings = None
+        try:
+            if path.exists():
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self.docs = data.get("docs", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable search index {path}: {e}")
+            self.docs = {}
+
+    def sync(self, products):
+        """Brings the index in line with the catalog. Returns (reindexed, removed) counts."""
+        live = set()
+        reindexed = 0
+        for product in products:
+            key = product_key(product)
+            if not key:
+                continue
+            live.add(key)
+            digest = fields_hash(product)
+            doc = self.docs.get(key)
+            if doc and doc["hash"] == digest:
+                continue
+            terms = document_terms(product)
+            self.docs[key] = {"hash": digest, "length": sum(terms.values()), "terms": terms}
+            reindexed += 1
+        removed = set(self.docs) - live
+        for key in removed:
+            del self.docs[key]
+        if reindexed or removed:
+            self.dirty = True
+            self._postings = None
+            logger.info(f"Search index: {reindexed} products (re)indexed, {len(removed)} removed, {len(self.docs)} total.")
+        return reindexed, len(removed)
+
+    def postings(self):
+        """term -> {product key: weighted tf}, built from the stored documents on first use."""
+        if self._postings is None:
+            postings = defaultdict(dict)
+            for key, doc in self.docs.items():
+                for term, tf in doc["terms"].items():
+                    postings[term][key] = tf
+            self._postings = postings
+        return self._postings
+
+    def search(self, query, k=10, allowed=None):
+        """Top-k (key, score) pairs for a free-text query, best first. `allowed` restricts the candidate keys."""
+        if not self.docs:
+            return []
+        postings = self.postings()
+        n = len(self.docs)
+        avg_length = sum(doc["length"] for doc in self.docs.values()) / n or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            matches = postings.get(term)
+            if not matches:
+                continue
+            idf = math.log(1 + (n - len(matches) + 0.5) / (len(matches) + 0.5))
+            for key, tf in matches.items():
+                if allowed is not None and key not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.docs[key]["length"] / avg_length)
+                scores[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def save(self):
+        """Writes the index atomically if anything changed."""
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.path, json.dumps({"version": INDEX_VERSION, "docs": self.docs}))
+            self.dirty = False
+        except Exception as e:
+            logger.error(f"Failed to save search index {self.path}: {e}")
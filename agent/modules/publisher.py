@@ -5,10 +5,15 @@ from email.mime.multipart import MIMEMultipart
 import os
 import git
 from pathlib import Path
-from config import PROJECT_ROOT
+from config import PROJECT_ROOT, PRODUCTS_FILE, ARTICLES_DIR, ARTICLES_INDEX_FILE, PARTS_IMAGES_DIR
 
 logger = logging.getLogger("FlightRiskAgent.Publisher")
 
+# What the agent writes; checked when no change set is reported (e.g. --phase deploy on its own)
+DEFAULT_PUBLISH_PATHS = (PRODUCTS_FILE, ARTICLES_DIR, ARTICLES_INDEX_FILE, PARTS_IMAGES_DIR)
+# Per-file diff stat lines in the commit message before the rest are summarized
+MAX_STAT_LINES = 25
+
 class Publisher:
     def __init__(self, dry_run=False):
         self.dry_run = dry_run
@@ -32,24 +37,69 @@ class Publisher:
         # 2. Send Summary Email
         self.send_summary_email(summary_data)
 
+    def repo_paths(self, paths):
+        """Repo-relative posix paths for the given files, dropping anything outside the repo."""
+        root = PROJECT_ROOT.resolve()
+        relative = set()
+        for path in paths:
+            try:
+                relative.add(Path(path).resolve().relative_to(root).as_posix())
+            except ValueError:
+                logger.warning(f"Not publishing {path}: outside the repository")
+        return sorted(relative)
+
+    def changed_files(self, repo, paths):
+        """Files under `paths` with changes to commit; git status only looks inside those paths."""
+        output = repo.git.status("--porcelain=v1", "-z", "--untracked-files=all", "--", *paths)
+        changed = []
+        records = iter(output.split("\0"))
+        for record in records:
+            # "XY path"; ignored files never show up, so the cache and journals stay out
+            if len(record) > 3:
+                changed.append(record[3:])
+                if record[0] in "RC":
+                    # Renames and copies are followed by their source path
+                    changed.append(next(records, ""))
+        return [path for path in changed if path]
+
+    def diff_stats(self, repo, paths):
+        """Per-path "+added -removed" lines for the staged changes, capped at MAX_STAT_LINES."""
+        lines = []
+        for row in repo.git.diff("--cached", "--numstat", "--", *paths).splitlines():
+            added, removed, path = row.split("\t", 2)
+            if added == "-":
+                lines.append(f"  binary  {path}")
+            else:
+                lines.append(f"  +{added} -{removed}  {path}")
+        if len(lines) > MAX_STAT_LINES:
+            lines = lines[:MAX_STAT_LINES] + [f"  ... and {len(lines) - MAX_STAT_LINES} more files"]
+        return lines
+
     def git_commit_push(self, summary):
-        """Commits changes to the repo."""
+        """
+        Commits the files this run changed and pushes. Only the change set the phases
+        reported (summary["changed_paths"]) is scanned, staged and committed; without one,
+        the agent's usual output paths are. Everything else in the tree is left alone.
+        """
+        changed_paths = summary.get("changed_paths")
+        paths = self.repo_paths(DEFAULT_PUBLISH_PATHS if changed_paths is None else changed_paths)
+        if not paths:
+            logger.info("No changes to commit.")
+            return
+
         if self.dry_run:
-            logger.info("DRY RUN: Skipping Git Commit & Push")
+            logger.info(f"DRY RUN: Skipping Git Commit & Push of {len(paths)} paths")
             return
 
         try:
             repo = git.Repo(PROJECT_ROOT)
             
-            # Check if dirty
-            if not repo.is_dirty(untracked_files=True):
+            files = self.changed_files(repo, paths)
+            if not files:
                 logger.info("No changes to commit.")
                 return
 
-            # Add specific files we care about to avoid adding junk
-            files_to_add = ["src/data/products.json", "src/data/articles/"]
-            # Or just add all
-            repo.git.add(all=True)
+            repo.git.add("--", *files)
             
             # Commit message
             msg_parts = []
@@ -61,9 +111,12 @@ class Publisher:
                 msg_parts.append(f"Published: {summary['new_article_title']}")
             
             commit_msg = "Agent Update: " + ", ".join(msg_parts) if msg_parts else "Agent Routine Maintenance"
+            stats = self.diff_stats(repo, files)
+            full_msg = commit_msg + ("\n\n" + "\n".join(stats) if stats else "")
             
-            repo.index.commit(commit_msg)
-            logger.info(f"Committed changes: {commit_msg}")
+            # Commit only these files, even if something else happens to be staged
+            repo.git.commit("-m", full_msg, "--", *files)
+            logger.info(f"Committed {len(files)} files: {commit_msg}")
             
             # Push (assuming remote is origin/main or origin/master)
             origin = repo.remote(name='origin')
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import math
+import time
+from config import HUNTER_SEEN_SET_FILE, SEEN_SET_CAPACITY, SEEN_SET_FP_RATE, SEEN_SET_REBUILD_DAYS
+from modules.atomic import atomic_write_bytes
+
+logger = logging.getLogger("FlightRiskAgent.SeenSet")
+
+NAME_FIELDS = ("name", "title", "product_name")
+LINK_FIELDS = ("amazonLink", "amazon_url", "getfpvLink", "getfpv_url")
+
+def record_keys(record):
+    """
+    Seen-set keys for a raw feed record or catalog product: its whitespace/case-folded
+    name, plus any direct product links (search links are derived from the name anyway).
+    Cheap on purpose, so it can run before normalization.
+    """
+    keys = []
+    for field in NAME_FIELDS:
+        name = record.get(field)
+        if name:
+            keys.append("n:" + " ".join(str(name).lower().split()))
+            break
+    for field in LINK_FIELDS:
+        link = record.get(field)
+        if link and "/s?k=" not in link and "catalogsearch" not in link:
+            keys.append("l:" + link.split("?")[0].rstrip("/").lower())
+    return keys
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for `capacity` items at false-positive rate `fp_rate`."""
+    def __init__(self, capacity, fp_rate, bits=None, count=0):
+        self.capacity = max(1, int(capacity))
+        self.fp_rate = fp_rate
+        self.m = max(8, int(math.ceil(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.m + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key):
+        new = False
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, key):
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+class SeenSet:
+    """
+    Persistent record of feed items the Hunter has already evaluated and turned down
+    (low rating, already stocked, near-duplicate). A hit lets scan_market drop the raw
+    record before normalizing or comparing it.
+
+    Lookups can give false positives (a new item wrongly skipped) at roughly `fp_rate`,
+    never false negatives. The filter is rebuilt from the catalog alone every
+    `rebuild_days`, or when it fills past `capacity`, so rejected items get a fresh
+    look from time to time (ratings change) and the error rate stays bounded.
+    """
+    def __init__(self, path=HUNTER_SEEN_SET_FILE, capacity=SEEN_SET_CAPACITY, fp_rate=SEEN_SET_FP_RATE, rebuild_days=SEEN_SET_REBUILD_DAYS):
+        self.path = path
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.rebuild_days = rebuild_days
+        self.built_at = time.time()
+        self.filter = BloomFilter(capacity, fp_rate)
+        self.hits = 0
+        self.load()
+
+    def load(self):
+        """Reads the saved filter; a missing, corrupt or differently-tuned file starts a fresh one."""
+        try:
+            with open(self.path, "rb") as f:
+                header = json.loads(f.readline())
+                bits = bytearray(f.read())
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable seen-set {self.path}: {e}")
+            return
+
+        if header.get("capacity") != self.capacity or header.get("fp_rate") != self.fp_rate:
+            logger.info("Seen-set tuning changed; starting a fresh filter.")
+            return
+        candidate = BloomFilter(self.capacity, self.fp_rate, bits, header.get("count", 0))
+        if len(bits) != len(candidate.bits):
+            logger.warning(f"Seen-set {self.path} has the wrong size; starting a fresh filter.")
+            return
+        self.filter = candidate
+        self.built_at = header.get("built_at", 0)
+
+    @property
+    def rebuild_due(self):
+        age_days = (time.time() - self.built_at) / 86400
+        return age_days >= self.rebuild_days or self.filter.count >= self.capacity
+
+    def refresh(self, products):
+        """Start-of-run sync: rebuilds from the catalog if due, else just adds any new catalog items."""
+        if self.rebuild_due:
+            logger.info(f"Rebuilding seen-set from {len(products)} catalog products.")
+            self.filter = BloomFilter(self.capacity, self.fp_rate)
+            self.built_at = time.time()
+        for product in products:
+            self.add(product)
+
+    def add(self, record):
+        for key in record_keys(record):
+            self.filter.add(key)
+
+    def seen(self, record):
+        if any(key in self.filter for key in record_keys(record)):
+            self.hits += 1
+            return True
+        return False
+
+    def save(self):
+        header = {
+            "capacity": self.capacity,
+            "fp_rate": self.fp_rate,
+            "count": self.filter.count,
+            "built_at": self.built_at,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(self.path, json.dumps(header).encode("utf-8") + b"\n" + bytes(self.filter.bits))
+        except Exception as e:
+            logger.error(f"Failed to save seen-set {self.path}: {e}")
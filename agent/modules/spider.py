@@ -1,149 +1,413 @@
-import re
-import json
+import asyncio
 import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from config import PRODUCTS_FILE, ARTICLES_DIR, USER_AGENT
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from config import (
+    ARTICLES_DIR, USER_AGENT, LINK_CHECK_TIMEOUT,
+    SPIDER_MAX_CONCURRENCY, SPIDER_PER_HOST_CONCURRENCY, AMAZON_SNIFF_MAX_BYTES
+)
+from modules.catalog import ProductCatalog
+from modules.link_health import LinkHealthStore
+from modules.link_resolver import LinkResolver
+from modules.article_manifest import ArticleManifest
+from modules.markdown_links import extract_links, rewrite_links, link_matches
+from modules.atomic import atomic_write_text
+from modules.host_health import HostHealthTracker, THROTTLE_STATUSES, parse_retry_after
 
 logger = logging.getLogger("FlightRiskAgent.Spider")
 
+# Amazon soft 404 / CAPTCHA fingerprints, matched against the raw body bytes
+AMAZON_SOFT_404_MARKERS = (b"we couldn't find that page", b"SORRY")
+AMAZON_SOFT_404_TITLES = (b"page not found", b"sorry")
+AMAZON_GENERIC_TITLES = (b"<title>Amazon.com</title>", b'<title dir="ltr">Amazon.com</title>')
+SNIFF_CHUNK_SIZE = 8192
+# URL substrings that mark a link as an Amazon page (and so subject to the soft 404 sniff)
+AMAZON_URL_MARKERS = ("amazon.com",)
+
 class Spider:
-    def __init__(self, dry_run=False):
+    def __init__(self, dry_run=False, force_recheck=False, max_concurrency=SPIDER_MAX_CONCURRENCY, per_host_concurrency=SPIDER_PER_HOST_CONCURRENCY, sniff_max_bytes=AMAZON_SNIFF_MAX_BYTES,
+                 catalog=None, articles_dir=ARTICLES_DIR, health=None, manifest=None, resolver=None, hosts=None):
         self.dry_run = dry_run
+        # Ignore cached verdicts and probe every link (results are still recorded)
+        self.force_recheck = force_recheck
+        # Shared run-wide catalog from main.py; standalone Spiders load (and save) their own
+        self.owns_catalog = catalog is None
+        self.catalog = catalog or ProductCatalog()
+        # Paths and stores are injectable so the Spider can be pointed at a synthetic site (see scripts/bench_spider.py)
+        self.articles_dir = articles_dir
+        self.health = health or LinkHealthStore()
+        # Circuit breakers; main.py passes the run-wide tracker so every stage sees a host's throttling
+        self.hosts = hosts or HostHealthTracker()
+        self.manifest = manifest or ArticleManifest()
+        # Search URL -> product page mappings; search links are checked via their (lighter) product page
+        self.resolver = resolver or LinkResolver()
+        self.timeout = LINK_CHECK_TIMEOUT
+        self.amazon_markers = AMAZON_URL_MARKERS
         self.links_checked = 0
         self.links_fixed = 0
+        # Links we could not judge (throttled, timed out, circuit open); never remediated
+        self.links_unknown = 0
+        # Files this run rewrote, for the Publisher's change set
+        self.changed_paths = set()
+        # Response body bytes actually pulled off the wire by probes
+        self.bytes_read = 0
+        self._stats_lock = threading.Lock()
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.sniff_max_bytes = sniff_max_bytes
+        # Created per run inside the event loop (see _audit)
+        self._global_limit = None
+        self._host_limits = {}
+        self._executor = None
+        # One keep-alive connection pool (adapter) per host, shared by the worker threads;
+        # each thread wraps it in its own Session, since Session cookies are not thread-safe
+        self._adapters = {}
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._local = threading.local()
 
     def crawl_and_audit(self):
         """Main entry point for the Spider module."""
         logger.info("Starting Link Audit...")
         
-        # 1. Audit Products
-        self.audit_products()
-        
-        # 2. Audit Articles (Markdown)
-        self.audit_articles()
+        try:
+            asyncio.run(self._audit())
+        finally:
+            self.close_sessions()
+            self.health.close()
+            self.resolver.close()
+            # The index is committed and read by the site; a dry run only refreshes the local stat cache
+            if self.manifest.save(write_index=not self.dry_run):
+                self.changed_paths.add(self.manifest.path)
         
         logger.info(f"Link Audit Complete. Checked: {self.links_checked}, Fixed: {self.links_fixed}")
+        logger.info(f"Link health cache: {self.health.hits} fresh, {self.health.misses} due for a probe. Body bytes read: {self.bytes_read}")
+        if self.links_unknown:
+            logger.warning(f"{self.links_unknown} links could not be verified (throttled or host backing off); left untouched.")
+
+    async def _audit(self):
+        """Collects every link up front, probes each unique URL once, then remediates."""
+        # 1. Gather link references from products and articles
+        logger.info(f"Scanning {self.catalog.path}...")
+        articles = self.load_articles()
+
+        urls = {p["amazonLink"] for p in self.catalog.products if p.get("amazonLink")}
+        for _, _, matches, _ in articles:
+            urls.update(url for _, url in matches)
+        logger.info(f"Collected {len(urls)} unique links from products and {len(articles)} articles.")
+
+        # 2. Probe each unique URL once, going to the product page for search links that have been resolved
+        targets = {url: self.resolver.cached(url) or url for url in urls}
+        resolved = sum(1 for url, target in targets.items() if target != url)
+        if resolved:
+            logger.info(f"Checking {resolved} search links via their resolved product pages.")
+        verdicts = await self.check_links(set(targets.values()))
 
-    def audit_products(self):
-        """Scans products.json for dead links."""
-        logger.info(f"Scanning {PRODUCTS_FILE}...")
+        results = {}
+        fallback = []
+        for url, target in targets.items():
+            if target != url and verdicts[target] is False:
+                # The product page is gone, not necessarily the search; re-resolve next time and check the search itself
+                self.resolver.forget(url)
+                fallback.append(url)
+            else:
+                results[url] = verdicts[target]
+        if fallback:
+            results.update(await self.check_links(fallback))
+        self.links_unknown = sum(1 for verdict in results.values() if verdict is None)
+
+        # 3. Fan the verdicts back out to every referencing product and article
+        self.audit_products(results)
+        self.audit_articles(articles, results)
+
+    async def check_links(self, urls):
+        """
+        Checks URLs concurrently under the global and per-host limits.
+        Returns {url: verdict} where verdict is True (alive), False (dead) or None (unknown).
+        """
+        urls = list(urls)
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits = {}
+        # check_link is blocking (requests), so probes run on a pool sized to the global limit
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="spider")
+        try:
+            verdicts = await asyncio.gather(*(self.check_link_async(url) for url in urls))
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        return dict(zip(urls, verdicts))
+
+    async def check_link_async(self, url):
+        """Runs check_link on the worker pool, bounded by the global and per-host limits."""
+        host = urlparse(url).netloc.lower()
+        host_limit = self._host_limits.get(host)
+        if host_limit is None:
+            host_limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+
+        # Take the host slot first so a slow host never parks global slots while it queues
+        async with host_limit:
+            async with self._global_limit:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, self.check_link, url)
+
+    def session_for(self, url):
+        """
+        Returns this thread's session for the URL's host, creating it on first use. The
+        sessions of all threads share the host's adapter, and so its keep-alive connections.
+        """
+        host = urlparse(url).netloc.lower()
+        sessions = getattr(self._local, "sessions", None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+        session = sessions.get(host)
+        if session is None:
+            with self._sessions_lock:
+                adapter = self._adapters.get(host)
+                if adapter is None:
+                    # Enough pooled connections for every concurrent probe against this host
+                    adapter = self._adapters[host] = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_concurrency)
+                session = sessions[host] = requests.Session()
+                session.headers.update({'User-Agent': USER_AGENT})
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions.append(session)
+        return session
+
+    def close_sessions(self):
+        """Closes every thread's sessions and the shared connection pools."""
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            for adapter in self._adapters.values():
+                adapter.close()
+            self._sessions = []
+            self._adapters = {}
+            # Threads from the next run must not pick up the closed sessions
+            self._local = threading.local()
+
+    def load_articles(self):
+        """
+        Collects links from every markdown article. Returns a list of (file_path, content, matches, links),
+        where matches are (anchor, url) pairs and links the parsed MarkdownLink spans.
+        Unchanged articles come straight from the manifest with content=None and links=None;
+        they are only read and parsed again if one of their links turns out to be dead.
+        """
+        if not self.articles_dir.exists():
+            logger.warning(f"Articles directory not found: {self.articles_dir}")
+            return []
+
+        articles = []
+        names = []
+        for file_path in self.articles_dir.glob("*.md"):
+            names.append(file_path.name)
+            try:
+                matches = self.manifest.unchanged_links(file_path)
+                if matches is not None:
+                    logger.debug(f"Unchanged article, reusing manifest links: {file_path.name}")
+                    articles.append((file_path, None, matches, None))
+                    continue
+
+                logger.info(f"Scanning article: {file_path.name}")
+                with open(file_path, 'r') as f:
+                    content = f.read()
+                # We skip internal links (starting with / or #); only http(s) links are extracted
+                links = extract_links(content)
+                matches = link_matches(links)
+                self.manifest.record(file_path, matches)
+                articles.append((file_path, content, matches, links))
+            except Exception as e:
+                logger.error(f"Error reading {file_path.name}: {e}")
+
+        self.manifest.prune(names)
+        return articles
+
+    def audit_products(self, results):
+        """Removes dead amazonLinks from the catalog using the collected link verdicts."""
         try:
-            with open(PRODUCTS_FILE, 'r') as f:
-                data = json.load(f)
-            
             modified = False
-            for product in data.get("products", []):
+            for product in self.catalog.products:
                 # Check Amazon/Affiliate Link
                 url = product.get("amazonLink")
-                if url:
-                    if not self.check_link(url):
-                        logger.warning(f"Dead link found for {product.get('name')}: {url}")
-                        if not self.dry_run:
-                            # For products, we might want to just flag it or remove it. 
-                            # The instructions say "remove the hyperlink but preserve text". 
-                            # For a JSON data field, we can't really "preserve text" other than the name.
-                            # I will leave the field but maybe mark it or log it. 
-                            # Actually, for JSON data, removing the link is probably best.
-                            product["amazonLink"] = "" 
-                            modified = True
-                            self.links_fixed += 1
-
-            if modified and not self.dry_run:
-                with open(PRODUCTS_FILE, 'w') as f:
-                    json.dump(data, f, indent=2)
-                logger.info(f"Updated {PRODUCTS_FILE} with removed links.")
+                # Only a definite False counts; unknown (None) never triggers remediation
+                if url and results.get(url) is False:
+                    logger.warning(f"Dead link found for {product.get('name')}: {url}")
+                    if not self.dry_run:
+                        # For products, we might want to just flag it or remove it. 
+                        # The instructions say "remove the hyperlink but preserve text". 
+                        # For a JSON data field, we can't really "preserve text" other than the name.
+                        # I will leave the field but maybe mark it or log it. 
+                        # Actually, for JSON data, removing the link is probably best.
+                        product["amazonLink"] = "" 
+                        self.catalog.mark_dirty(product)
+                        modified = True
+                        self.links_fixed += 1
+
+            if modified and not self.dry_run and self.owns_catalog:
+                self.catalog.save()
                 
         except Exception as e:
             logger.error(f"Error auditing products: {e}")
 
-    def audit_articles(self):
-        """Scans markdown articles for dead links."""
-        if not ARTICLES_DIR.exists():
-            logger.warning(f"Articles directory not found: {ARTICLES_DIR}")
-            return
-
-        for file_path in ARTICLES_DIR.glob("*.md"):
-            logger.info(f"Scanning article: {file_path.name}")
-            self.process_markdown_file(file_path)
+    def audit_articles(self, articles, results):
+        """Remediates dead links in markdown articles using the collected link verdicts."""
+        for file_path, content, matches, links in articles:
+            self.process_markdown_file(file_path, content, matches, links, results)
 
-    def process_markdown_file(self, file_path):
-        """Reads a markdown file, finds links, checks them, and remediates if dead."""
+    def process_markdown_file(self, file_path, content, matches, links, results):
+        """Remediates the dead links found in one markdown file with a single rewrite."""
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
+            if content is None:
+                if all(results.get(url) is not False for _, url in matches):
+                    self.links_checked += len(matches)
+                    return
+                # Unchanged file skipped at load time, but it has dead links to remediate
+                with open(file_path, 'r') as f:
+                    content = f.read()
+                links = extract_links(content)
+
+            edits = []
+            for link in links:
+                dead = results.get(link.url) is False
+                if link.kind == "definition":
+                    # The usages are unlinked below, so drop the dangling [label]: url line too
+                    if dead:
+                        edits.append((link.start, link.end, ""))
+                    continue
 
-            # Regex for markdown links: [anchor text](url)
-            # We skip internal links (starting with / or #)
-            # This regex captures the whole link, the anchor text, and the url
-            link_pattern = re.compile(r'\[([^\]]+)\]\((https?://[^)]+)\)')
-            
-            new_content = content
-            matches = link_pattern.findall(content)
-            
-            file_modified = False
-            
-            for anchor_text, url in matches:
                 self.links_checked += 1
-                if not self.check_link(url):
-                    logger.warning(f"Dead link in {file_path.name}: {url}")
+                if dead:
+                    logger.warning(f"Dead link in {file_path.name}: {link.url}")
+                    # Remediation: Replace [text](dead_url) (or [text][ref]) with text
+                    edits.append((link.start, link.end, link.text))
                     if not self.dry_run:
-                        # Remediation: Replace [text](dead_url) with text
-                        # We need to escape regex special chars in text and url for the substitution
-                        safe_anchor = re.escape(anchor_text)
-                        safe_url = re.escape(url)
-                        # We reconstruct the pattern to match this specific instance
-                        specific_pattern = f'\\[{safe_anchor}\\]\\({safe_url}\\)'
-                        new_content = re.sub(specific_pattern, anchor_text, new_content)
-                        file_modified = True
                         self.links_fixed += 1
 
-            if file_modified and not self.dry_run:
-                with open(file_path, 'w') as f:
-                    f.write(new_content)
+            if edits and not self.dry_run:
+                new_content = rewrite_links(content, edits)
+                atomic_write_text(file_path, new_content)
+                self.changed_paths.add(file_path)
+                self.manifest.record(file_path, link_matches(extract_links(new_content)))
                 logger.info(f"Remediated dead links in {file_path.name}")
 
         except Exception as e:
             logger.error(f"Error processing {file_path.name}: {e}")
 
     def check_link(self, url):
-        """Checks if a URL is alive (200-299 status code)."""
+        """
+        Checks if a URL is alive, reusing a fresh verdict from the link health store when possible.
+        Returns True/False, or None when the link could not be judged (throttled, timed out,
+        or its host's circuit is open). Unknown results are not stored.
+        """
+        if not self.force_recheck:
+            cached = self.health.lookup(url)
+            if cached is not None:
+                logger.debug(f"Link health cache hit for {url}: {'alive' if cached else 'dead'}")
+                return cached
+
+        if not self.hosts.allow(url):
+            logger.debug(f"Circuit open, skipping {url}")
+            return None
+
+        alive, status_code = self.probe(url)
+        if alive is not None:
+            self.health.record(url, alive, status_code)
+        return alive
+
+    def probe(self, url):
+        """
+        Probes a URL over the network. Returns (alive, status_code); alive means 200-299 and not a soft 404.
+        Timeouts and throttle responses (429/503) return alive=None and count against the host's circuit.
+        """
+        # Pooled per-host session; it also sends a browser user agent to avoid being blocked by Amazon/Retailers
+        session = self.session_for(url)
+        is_amazon = any(marker in url for marker in self.amazon_markers)
+        # Revalidate with ETag/Last-Modified, but only a link that was healthy last time:
+        # a 304 means "same page as before", which is only good news if that page was fine
+        record = self.health.get(url)
+        headers = self.health.conditional_headers(url) if record and record["alive"] else {}
         try:
-            # Fake a browser user agent to avoid being blocked by Amazon/Retailers
-            headers = {'User-Agent': USER_AGENT}
-            response = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
-            
-            # If HEAD fails (some servers deny it), try GET
-            if response.status_code == 405 or response.status_code == 403:
-                response = requests.get(url, headers=headers, timeout=5, stream=True)
+            if is_amazon:
+                # Amazon needs the body for the soft 404 check, so go straight to a single streamed GET
+                response = session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            else:
+                response = session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+                
+                # If HEAD fails (some servers deny it), try GET
+                if response.status_code == 405 or response.status_code == 403:
+                    response = session.get(url, headers=headers, timeout=self.timeout, stream=True)
             
-            if 200 <= response.status_code < 300:
-                # Extra check for Amazon soft 404s (Dog pages)
-                if "amazon.com" in url:
-                    # Amazon returns 200 for their "Sorry we couldn't find that page" error
-                    # Also "CAPTCHA" pages start with generic <title>Amazon.com</title>
-                    try:
-                        # We might need to make a full GET if we only did HEAD
-                        if response.request.method == 'HEAD':
-                             response = requests.get(url, headers=headers, timeout=5)
-                        
-                        text = response.text
-                        if "we couldn't find that page" in text or "SORRY" in text:
-                            logger.warning(f"Amazon Soft 404 detected for {url}")
-                            return False
-                        
-                        # CAPTCHA / Generic Home Page check
-                        if "<title>Amazon.com</title>" in text or '<title dir="ltr">Amazon.com</title>' in text:
-                            logger.warning(f"Amazon Generic/CAPTCHA detected (likely dead/blocked) for {url}")
-                            return False
-
-                    except Exception:
-                        pass # verification failed, assume it's okay or let it be
+            try:
+                if response.status_code in THROTTLE_STATUSES:
+                    logger.debug(f"Link {url} throttled with status {response.status_code}")
+                    self.hosts.record_failure(url, parse_retry_after(response))
+                    return None, response.status_code
+                self.hosts.record_success(url)
 
-                return True
-            else:
-                logger.debug(f"Link {url} returned status {response.status_code}")
-                return False
+                if response.status_code == 304:
+                    logger.debug(f"Link {url} not modified since last check")
+                    return True, response.status_code
+
+                if 200 <= response.status_code < 300:
+                    self.health.save_validators(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                    # Extra check for Amazon soft 404s (Dog pages)
+                    if is_amazon:
+                        try:
+                            return self.sniff_amazon(response, url), response.status_code
+                        except Exception:
+                            pass # verification failed, assume it's okay or let it be
+
+                    return True, response.status_code
+                else:
+                    logger.debug(f"Link {url} returned status {response.status_code}")
+                    return False, response.status_code
+            finally:
+                with self._stats_lock:
+                    self.bytes_read += response.raw.tell()
+                # Hand the connection back to the host's pool (unread body is discarded)
+                response.close()
+        except requests.Timeout as e:
+            logger.debug(f"Link check timed out for {url}: {e}")
+            self.hosts.record_failure(url)
+            return None, None
         except requests.RequestException as e:
             logger.debug(f"Link check failed for {url}: {e}")
-            return False
+            self.hosts.record_error(url)
+            return False, None
+
+    def sniff_amazon(self, response, url):
+        """
+        Reads a streamed Amazon response in chunks until it can tell a real page from a soft 404.
+        Amazon returns 200 for their "Sorry we couldn't find that page" error, and
+        "CAPTCHA" pages start with generic <title>Amazon.com</title>.
+        Stops at the first verdict or after AMAZON_SNIFF_MAX_BYTES. Returns True if the page looks alive.
+        """
+        body = b""
+        for chunk in response.iter_content(chunk_size=SNIFF_CHUNK_SIZE):
+            body += chunk
+
+            if any(marker in body for marker in AMAZON_SOFT_404_MARKERS):
+                logger.warning(f"Amazon Soft 404 detected for {url}")
+                return False
+
+            # CAPTCHA / Generic Home Page check
+            if any(title in body for title in AMAZON_GENERIC_TITLES):
+                logger.warning(f"Amazon Generic/CAPTCHA detected (likely dead/blocked) for {url}")
+                return False
+
+            # Once the <title> has closed, a specific title means a real page
+            title_end = body.find(b"</title>")
+            if title_end != -1:
+                title = body[body.rfind(b">", 0, title_end) + 1:title_end].lower()
+                if any(marker in title for marker in AMAZON_SOFT_404_TITLES):
+                    logger.warning(f"Amazon Soft 404 detected for {url}")
+                    return False
+                return True
+
+            if len(body) >= self.sniff_max_bytes:
+                break
+
+        return True
@@ -1,4 +1,3 @@
-import json
 from pathlib import Path
 import sys
 from collections import defaultdict
@@ -6,13 +5,14 @@ from collections import defaultdict
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
 from agent.config import PRODUCTS_FILE
+from modules.catalog import ProductCatalog
 
 def analyze_images():
     print(f"Analyzing images in {PRODUCTS_FILE}...")
     
-    with open(PRODUCTS_FILE, 'r') as f:
-        data = json.load(f)
+    data = ProductCatalog().data
     
     products = data.get("products", [])
     image_counts = defaultdict(list)
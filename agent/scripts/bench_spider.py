@@ -0,0 +1,211 @@
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add agent dir to path
+AGENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(AGENT_DIR))
+sys.path.append(str(AGENT_DIR / "scripts"))
+from modules.spider import Spider
+from modules.catalog import ProductCatalog
+from modules.link_health import LinkHealthStore
+from modules.article_manifest import ArticleManifest
+from modules.link_resolver import LinkResolver
+from fixture_server import FixtureServer, EXPECTED_VERDICTS
+
+# Default share of each fixture behaviour in the synthetic link pool
+DEFAULT_MIX = "ok=40,amazon-product=25,no-head=5,forbidden-head=5,redirect=5,slow=5,dead=5,amazon-soft404=4,amazon-captcha=2,timeout=2,throttle=2"
+
+# Which simulated host serves which behaviours. Each host is its own server/port, so a
+# throttling or stalled host trips its own circuit without taking the others down.
+HOST_FOR_BEHAVIOUR = {
+    "amazon-product": "amazon",
+    "amazon-soft404": "amazon",
+    "amazon-captcha": "amazon",
+    "throttle": "throttled",
+    "timeout": "stalled",
+}
+
+def parse_mix(spec):
+    """'ok=40,dead=5' -> [('ok', 40.0), ('dead', 5.0)]"""
+    mix = []
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        if name not in EXPECTED_VERDICTS:
+            raise ValueError(f"Unknown fixture behaviour: {name}")
+        mix.append((name, float(weight)))
+    return mix
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def build_site(root, hosts, mix, n_products, n_articles, links_per_article, rng):
+    """Writes a synthetic products.json and article set whose links point at the fixture hosts."""
+    names, weights = zip(*mix)
+    expected = {}
+
+    def make_url(i):
+        behaviour = rng.choices(names, weights)[0]
+        server = hosts[HOST_FOR_BEHAVIOUR.get(behaviour, "retail")]
+        url = f"{server.base_url}/{behaviour}/{i}"
+        expected[url] = EXPECTED_VERDICTS[behaviour]
+        return url
+
+    product_urls = [make_url(i) for i in range(n_products)]
+    products = [
+        {"id": f"bench-{i}", "name": f"Bench Product {i}", "amazonLink": url}
+        for i, url in enumerate(product_urls)
+    ]
+    products_file = root / "products.json"
+    products_file.write_text(json.dumps({"products": products}, indent=2))
+
+    # Articles reuse product links heavily (like real posts) plus some links of their own
+    articles_dir = root / "articles"
+    articles_dir.mkdir()
+    extra_urls = [make_url(n_products + i) for i in range(max(1, n_articles * links_per_article // 4))]
+    pool = product_urls + extra_urls
+    for a in range(n_articles):
+        lines = [f"---\ntitle: \"Bench Article {a}\"\n---\n"]
+        for j in range(links_per_article):
+            lines.append(f"Paragraph {j} mentions [a part]({rng.choice(pool)}) in passing.\n")
+        (articles_dir / f"bench-article-{a}.md").write_text("\n".join(lines))
+
+    return products_file, articles_dir, expected
+
+def run_once(args, hosts, products_file, articles_dir, state_dir, expected):
+    """One crawl_and_audit pass; returns the measurements."""
+    for server in hosts.values():
+        server.reset_stats()
+
+    catalog = ProductCatalog(products_file)
+    spider = Spider(
+        dry_run=args.dry_run,
+        force_recheck=args.force_recheck,
+        max_concurrency=args.concurrency,
+        per_host_concurrency=args.per_host,
+        catalog=catalog,
+        articles_dir=articles_dir,
+        health=LinkHealthStore(state_dir / "link_health.sqlite3"),
+        manifest=ArticleManifest(state_dir / "articles.index.json", state_dir / "article_manifest.json"),
+        resolver=LinkResolver(state_dir / "resolved_links.sqlite3")
+    )
+    spider.timeout = args.timeout
+    spider.amazon_markers = ("amazon.com", "/amazon-")
+
+    latencies = []
+    verdicts = {}
+    probe, check_link = spider.probe, spider.check_link
+
+    def timed_probe(url):
+        start = time.perf_counter()
+        try:
+            return probe(url)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    def recording_check_link(url):
+        verdicts[url] = check_link(url)
+        return verdicts[url]
+
+    spider.probe = timed_probe
+    spider.check_link = recording_check_link
+
+    start = time.perf_counter()
+    spider.crawl_and_audit()
+    elapsed = time.perf_counter() - start
+    # As main.py does: persist the catalog edits so the next run starts from the remediated file
+    if not args.dry_run:
+        catalog.compact()
+
+    mismatches = {}
+    for url, verdict in verdicts.items():
+        # Unknown is acceptable anywhere a circuit may have opened; a wrong definite verdict is not
+        if verdict is not None and verdict != expected.get(url):
+            behaviour = url.split("/")[3]
+            mismatches[behaviour] = mismatches.get(behaviour, 0) + 1
+
+    return {
+        "elapsed": elapsed,
+        "unique_urls": len(verdicts),
+        "probes": len(latencies),
+        "latencies": latencies,
+        "bytes_read": spider.bytes_read,
+        "bytes_sent": sum(server.bytes_sent for server in hosts.values()),
+        "requests": sum(server.requests_served for server in hosts.values()),
+        "unknown": sum(1 for verdict in verdicts.values() if verdict is None),
+        "links_fixed": spider.links_fixed,
+        "mismatches": mismatches,
+    }
+
+def report(run_no, result):
+    lat_ms = [x * 1000 for x in result["latencies"]]
+    rate = result["unique_urls"] / result["elapsed"] if result["elapsed"] else 0.0
+    print(f"\n--- Run {run_no} ---")
+    print(f"Wall time:          {result['elapsed']:.2f}s")
+    print(f"Unique URLs:        {result['unique_urls']}  ({rate:.1f} URLs/s)")
+    print(f"Network probes:     {result['probes']}  ({result['requests']} HTTP requests)")
+    if lat_ms:
+        print(f"Check latency:      p50 {percentile(lat_ms, 50):.0f}ms  p99 {percentile(lat_ms, 99):.0f}ms  mean {statistics.mean(lat_ms):.0f}ms")
+    # The server figure includes whatever the kernel buffered before the client hung up
+    print(f"Bytes transferred:  {result['bytes_read'] / 1024:.1f} KB body read by Spider ({result['bytes_sent'] / 1024:.1f} KB written by server)")
+    print(f"Unknown verdicts:   {result['unknown']}")
+    print(f"Links remediated:   {result['links_fixed']}")
+    if result["mismatches"]:
+        print(f"VERDICT MISMATCHES: {result['mismatches']}")
+    else:
+        print("Verdicts:           all match the fixture expectations")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Spider.crawl_and_audit against a local fixture server")
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--links-per-article", type=int, default=15)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated behaviour=weight pairs")
+    parser.add_argument("--latency", default="lognormal:60:0.5", help="fixed:<ms> | uniform:<lo>:<hi> | lognormal:<median_ms>:<sigma>")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Spider request timeout (s)")
+    parser.add_argument("--hang", type=float, default=4.0, help="How long the timeout fixture stalls (s)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=1, help="Repeat runs share link-health state, showing warm-cache behaviour")
+    parser.add_argument("--force-recheck", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="Detect only; don't rewrite the synthetic files")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hosts = {name: FixtureServer(0, args.latency, args.hang).start() for name in ("retail", "amazon", "throttled", "stalled")}
+    root = Path(tempfile.mkdtemp(prefix="spider-bench-"))
+    try:
+        state_dir = root / "state"
+        state_dir.mkdir()
+        products_file, articles_dir, expected = build_site(
+            root, hosts, parse_mix(args.mix), args.products, args.articles, args.links_per_article, rng
+        )
+        print(f"Synthetic site: {args.products} products, {args.articles} articles x {args.links_per_article} links, "
+              f"{len(expected)} distinct URLs, latency {args.latency}")
+
+        mismatched = False
+        for run_no in range(1, args.runs + 1):
+            result = run_once(args, hosts, products_file, articles_dir, state_dir, expected)
+            report(run_no, result)
+            mismatched = mismatched or bool(result["mismatches"])
+    finally:
+        for server in hosts.values():
+            server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+    sys.exit(1 if mismatched else 0)
+
+if __name__ == "__main__":
+    main()
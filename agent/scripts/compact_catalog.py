@@ -0,0 +1,20 @@
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
+
+logging.basicConfig(level=logging.INFO)
+
+def compact_catalog():
+    """Folds any pending catalog journal into products.json."""
+    catalog = ProductCatalog()
+    if not catalog.compact():
+        print("Catalog journal is empty; products.json is current.")
+
+if __name__ == "__main__":
+    compact_catalog()
@@ -1,4 +1,3 @@
-import json
 from pathlib import Path
 import sys
 from collections import defaultdict
@@ -6,51 +5,38 @@ from collections import defaultdict
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
 from agent.config import PRODUCTS_FILE
-
-GENERIC_IMAGES = [
-    "/images/parts/generic-drone.png",
-    "/images/parts/generic-radio.png",
-    "/images/parts/generic-goggles.png",
-    "/images/parts/generic-vtx.png",
-    "/images/parts/generic-tool.png",
-    "/images/parts/generic-lipo.png",
-    "",
-    None
-]
+from modules.catalog import ProductCatalog
+from modules.catalog_frame import CatalogFrame
 
 
 def find_missing_images():
     print(f"Scanning {PRODUCTS_FILE} for generic or missing images...\n")
     
-    with open(PRODUCTS_FILE, 'r') as f:
-        data = json.load(f)
+    data = ProductCatalog().data
     
-    products = data.get("products", [])
+    frame = CatalogFrame(data.get("products", []))
     missing_count = 0
     generic_usage = defaultdict(list)
     missing_files = []
 
     public_dir = PROJECT_ROOT / "public"
 
-    for p in products:
-        img_path = p.get("imageUrl", "")
-        
-        # Check if it's a generic image
-        if img_path in GENERIC_IMAGES:
-            generic_usage[img_path].append(p.get("name"))
+    # Generic placeholders and empty images come straight off the masks
+    for p in frame.rows(frame.image_is_generic):
+        generic_usage[p.get("imageUrl")].append(p.get("name"))
+    for p in frame.rows(~frame.has_image):
+        generic_usage["(Empty)"].append(p.get("name"))
+    missing_count += int(frame.needs_image().sum())
+
+    # Only real local paths need a filesystem check
+    for p in frame.rows(frame.image_is_local & ~frame.image_is_generic):
+        img_path = p.get("imageUrl")
+        full_path = public_dir / img_path.lstrip("/")
+        if not full_path.exists():
+            missing_files.append(f"[{p.get('id')}] {p.get('name')} -> File not found: {img_path}")
             missing_count += 1
-            continue
-
-        # Check if file exists
-        if img_path and img_path.startswith("/"):
-            full_path = public_dir / img_path.lstrip("/")
-            if not full_path.exists():
-                missing_files.append(f"[{p.get('id')}] {p.get('name')} -> File not found: {img_path}")
-                missing_count += 1
-        elif not img_path:
-             generic_usage["(Empty)"].append(p.get("name"))
-             missing_count += 1
 
     print("\n--- Products using Generic Images ---")
     for img, names in generic_usage.items():
@@ -0,0 +1,195 @@
+import argparse
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the sites the Spider audits. The first path segment picks the behaviour,
+# so a synthetic catalog can mix them freely, e.g. http://127.0.0.1:8900/amazon-soft404/17
+#
+#   ok               200 on HEAD and GET
+#   no-head          405 on HEAD, 200 on GET
+#   forbidden-head   403 on HEAD, 200 on GET
+#   redirect         301 to /ok/<id>
+#   slow             200 after 10x the normal latency
+#   timeout          hangs for `hang` seconds before answering (longer than the client timeout)
+#   dead             404
+#   throttle         503 with Retry-After
+#   amazon-product   200 with a large product page (real title)
+#   amazon-soft404   200 "Sorry, we couldn't find that page" dog page
+#   amazon-captcha   200 page with the generic <title>Amazon.com</title>
+#
+# Anything whose first segment starts with "amazon-" should be treated as an Amazon URL by the client.
+
+# Verdict the Spider should reach for each behaviour (None = unknown / not judged)
+EXPECTED_VERDICTS = {
+    "ok": True,
+    "no-head": True,
+    "forbidden-head": True,
+    "redirect": True,
+    "slow": True,
+    "timeout": None,
+    "dead": False,
+    "throttle": None,
+    "amazon-product": True,
+    "amazon-soft404": False,
+    "amazon-captcha": False,
+}
+
+AMAZON_PAGE_BYTES = 300 * 1024
+
+def parse_latency(spec):
+    """
+    Builds a latency sampler (seconds) from a spec string:
+      fixed:<ms>                 always <ms>
+      uniform:<lo_ms>:<hi_ms>    uniform between the bounds
+      lognormal:<median_ms>:<sigma>  long-tailed, like real retail sites
+    """
+    kind, *args = spec.split(":")
+    args = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda: args[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(args[0] / 1000)
+        return lambda: random.lognormvariate(mu, args[1])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+def amazon_page(title, body_text, size=AMAZON_PAGE_BYTES):
+    """An Amazon-like page: a short head with the title, then filler up to `size` bytes."""
+    head = f'<!doctype html><html><head><meta charset="utf-8"><title dir="ltr">{title}</title></head><body>'
+    page = head + body_text
+    filler = "<div class=\"s-result-item\">" + "x" * 200 + "</div>\n"
+    repeats = max(0, (size - len(page)) // len(filler))
+    return (page + filler * repeats + "</body></html>").encode("utf-8")
+
+class CountingWriter:
+    """Wraps the handler's output stream to tally bytes sent."""
+    def __init__(self, raw, server):
+        self.raw = raw
+        self.server = server
+
+    def write(self, data):
+        with self.server.stats_lock:
+            self.server.bytes_sent += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        return self.raw.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client-side connection pooling is exercised
+
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile, self.server)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def respond(self, status, body=b"", headers=None, send_body=True):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body and body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # Streaming clients hang up once they have their verdict
+                self.close_connection = True
+
+    def handle_request(self, send_body):
+        with self.server.stats_lock:
+            self.server.requests_served += 1
+
+        parts = self.path.strip("/").split("/")
+        behaviour = parts[0]
+        item_id = parts[1] if len(parts) > 1 else "0"
+        is_head = not send_body
+
+        delay = self.server.latency()
+        if behaviour == "slow":
+            delay *= 10
+        elif behaviour == "timeout":
+            delay = self.server.hang
+        time.sleep(delay)
+
+        ok_body = f"<html><head><title>Item {item_id}</title></head><body>ok</body></html>".encode("utf-8")
+        if behaviour in ("ok", "slow", "timeout"):
+            self.respond(200, ok_body, {"ETag": f'"{behaviour}-{item_id}"'}, send_body)
+        elif behaviour == "no-head":
+            self.respond(405 if is_head else 200, b"" if is_head else ok_body, send_body=send_body)
+        elif behaviour == "forbidden-head":
+            self.respond(403 if is_head else 200, b"" if is_head else ok_body, send_body=send_body)
+        elif behaviour == "redirect":
+            self.respond(301, headers={"Location": f"/ok/{item_id}"}, send_body=send_body)
+        elif behaviour == "dead":
+            self.respond(404, b"not found", send_body=send_body)
+        elif behaviour == "throttle":
+            self.respond(503, b"slow down", {"Retry-After": "1"}, send_body)
+        elif behaviour == "amazon-product":
+            self.respond(200, amazon_page(f"Amazon.com: Synthetic Product {item_id}", "<h1>Product</h1>"), send_body=send_body)
+        elif behaviour == "amazon-soft404":
+            self.respond(200, amazon_page("Page Not Found", "<img alt=\"SORRY\"> we couldn't find that page"), send_body=send_body)
+        elif behaviour == "amazon-captcha":
+            self.respond(200, amazon_page("Amazon.com", "<form action=\"/errors/validateCaptcha\"></form>"), send_body=send_body)
+        else:
+            self.respond(404, b"unknown fixture", send_body=send_body)
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency="fixed:20", hang=10.0):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.latency = parse_latency(latency)
+        self.hang = hang
+        self.stats_lock = threading.Lock()
+        self.bytes_sent = 0
+        self.requests_served = 0
+
+    @property
+    def base_url(self):
+        """Root URL; the port makes each server a distinct host to per-host limits and circuit breakers."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serves on a background thread and returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def reset_stats(self):
+        """Zeroes the byte and request counters."""
+        with self.stats_lock:
+            self.bytes_sent = 0
+            self.requests_served = 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP stand-in for the sites the Spider audits")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="fixed:20", help="fixed:<ms> | uniform:<lo>:<hi> | lognormal:<median_ms>:<sigma>")
+    parser.add_argument("--hang", type=float, default=10.0, help="Seconds the /timeout behaviour stalls")
+    args = parser.parse_args()
+
+    server = FixtureServer(args.port, args.latency, args.hang)
+    print(f"Fixture server listening on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import json
 import logging
 import sys
 from pathlib import Path
@@ -6,7 +5,8 @@ from pathlib import Path
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
-from agent.config import PRODUCTS_FILE
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("HydrateImages")
@@ -29,11 +29,9 @@ def hydrate_images():
     logger.info("Hydrating product images...")
     
     try:
-        with open(PRODUCTS_FILE, 'r') as f:
-            data = json.load(f)
-        
+        catalog = ProductCatalog()
         updated_count = 0
-        products = data.get("products", [])
+        products = catalog.products
         
         for product in products:
             name = product.get("name")
@@ -41,12 +39,12 @@ def hydrate_images():
                 # Update image if it's currently a placeholder or we want to force valid URL
                 if "placeholder" in product.get("imageUrl", ""):
                     product["imageUrl"] = IMAGE_MAP[name]
+                    catalog.mark_dirty(product)
                     logger.info(f"Updated image for: {name}")
                     updated_count += 1
         
         if updated_count > 0:
-            with open(PRODUCTS_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
+            catalog.compact()
             logger.info(f"Successfully updated {updated_count} product images.")
         else:
             logger.info("No products needed image updates.")
@@ -1,4 +1,3 @@
-import json
 import os
 from pathlib import Path
 import sys
@@ -6,13 +5,13 @@ import sys
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
-from agent.config import PRODUCTS_FILE
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
 
 IMAGES_DIR = PROJECT_ROOT / "public/images/parts"
 
 def identify_low_res():
-    with open(PRODUCTS_FILE, 'r') as f:
-        data = json.load(f)
+    data = ProductCatalog().data
     
     products = data.get("products", [])
     low_res_products = []
@@ -1,15 +1,14 @@
-import json
 from pathlib import Path
 import sys
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
-from agent.config import PRODUCTS_FILE
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
 
 def list_images():
-    with open(PRODUCTS_FILE, 'r') as f:
-        data = json.load(f)
+    data = ProductCatalog().data
     
     products = data.get("products", [])
     print(f"Found {len(products)} products.")
@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 import subprocess
@@ -9,7 +8,9 @@ from urllib.parse import urlparse
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
-from agent.config import PRODUCTS_FILE
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
+from modules.link_health import LinkHealthStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("LocalizeImages")
@@ -29,19 +30,36 @@ def get_filename_from_url(url, product_name):
     
     return f"{slug}{ext}"
 
+def parse_header_dump(path):
+    """Reads the last response's headers from a curl -D dump (after redirects) into a lowercase dict."""
+    headers = {}
+    try:
+        text = path.read_text(errors="replace")
+    except OSError:
+        return headers
+    for line in text.splitlines():
+        if line.startswith("HTTP/"):
+            headers = {}  # a new response in the redirect chain
+        elif ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return headers
+
 def localize_images():
     logger.info("Starting image localization with curl...")
     
     try:
-        with open(PRODUCTS_FILE, 'r') as f:
-            data = json.load(f)
-        
-        products = data.get("products", [])
+        catalog = ProductCatalog()
+        products = catalog.products
         updated_count = 0
         
         # Ensure directory exists
         IMAGES_DIR.mkdir(parents=True, exist_ok=True)
         
+        # ETag/Last-Modified from earlier downloads, for conditional re-fetches
+        store = LinkHealthStore()
+        skipped_count = 0
+        
         for product in products:
             image_url = product.get("imageUrl", "")
             
@@ -50,12 +68,17 @@ def localize_images():
                
                 filename = get_filename_from_url(image_url, product.get("name"))
                 local_path = IMAGES_DIR / filename
+                # Download next to the target so a 304 or failure never clobbers the existing file
+                part_path = local_path.with_name(local_path.name + ".part")
+                header_path = local_path.with_name(local_path.name + ".headers")
                 
                 # Use curl
                 try:
                     # -L: Follow redirects
                     # -s: Silent mode
                     # -o: Output file
+                    # -D: Dump response headers (for ETag/Last-Modified)
+                    # -w: Print the final HTTP status code
                     # --insecure: Bypass SSL verification issues (same as verify=False)
                     # --user-agent: Spoof UA
                     cmd = [
@@ -64,9 +87,15 @@ def localize_images():
                         "-s", 
                         "--insecure",
                         "--user-agent", "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
-                        "-o", str(local_path), 
-                        image_url
+                        "-o", str(part_path), 
+                        "-D", str(header_path),
+                        "-w", "%{http_code}",
                     ]
+                    # Only revalidate if we still have the bytes the validators describe
+                    if local_path.exists():
+                        for name, value in store.conditional_headers(image_url).items():
+                            cmd += ["-H", f"{name}: {value}"]
+                    cmd.append(image_url)
                     
                     result = subprocess.run(
                         cmd,
@@ -74,21 +103,39 @@ def localize_images():
                         text=True,
                         timeout=30
                     )
+                    status = result.stdout.strip()
+                    headers = parse_header_dump(header_path)
                     
-                    if result.returncode == 0 and local_path.exists() and local_path.stat().st_size > 0:
+                    if result.returncode == 0 and status == "304":
+                        # Remote image unchanged: keep the local copy, skip the download
+                        product["imageUrl"] = f"/images/parts/{filename}"
+                        catalog.mark_dirty(product)
+                        updated_count += 1
+                        skipped_count += 1
+                        logger.info(f"Not modified, reusing {product['imageUrl']}")
+                    elif result.returncode == 0 and part_path.exists() and part_path.stat().st_size > 0:
+                        os.replace(part_path, local_path)
+                        store.save_validators(image_url, headers.get("etag"), headers.get("last-modified"))
                          # Update product with local path
                         product["imageUrl"] = f"/images/parts/{filename}"
+                        catalog.mark_dirty(product)
                         updated_count += 1
                         logger.info(f"Saved to {product['imageUrl']}")
                     else:
-                        logger.error(f"Failed to download {image_url}. Return code: {result.returncode}, Stderr: {result.stderr}")
+                        logger.error(f"Failed to download {image_url}. Return code: {result.returncode}, Status: {status}, Stderr: {result.stderr}")
                         
                 except Exception as e:
                     logger.error(f"Error calling curl for {image_url}: {e}")
+                finally:
+                    for tmp in (part_path, header_path):
+                        if tmp.exists():
+                            tmp.unlink()
                     
+        store.close()
+        if skipped_count:
+            logger.info(f"{skipped_count} images were unchanged upstream and not re-downloaded.")
         if updated_count > 0:
-            with open(PRODUCTS_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
+            catalog.compact()
             logger.info(f"Successfully localized {updated_count} images.")
         else:
             logger.info("No remote images found to localize.")
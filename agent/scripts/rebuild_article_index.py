@@ -0,0 +1,22 @@
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from agent.config import ARTICLES_DIR
+from modules.article_manifest import ArticleManifest
+
+logging.basicConfig(level=logging.INFO)
+
+def rebuild_article_index():
+    """Re-parses every article into src/data/articles.index.json (after hand edits, or to recover the file)."""
+    manifest = ArticleManifest()
+    manifest.rebuild(ARTICLES_DIR)
+    manifest.save()
+    print(f"Indexed {len(manifest.entries)} articles into {manifest.path}")
+
+if __name__ == "__main__":
+    rebuild_article_index()
@@ -1,6 +1,6 @@
-import json
 import os
 import cloudscraper
+import requests
 from bs4 import BeautifulSoup
 from pathlib import Path
 import sys
@@ -9,22 +9,62 @@ import time
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
-from agent.config import PRODUCTS_FILE
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from agent.config import PRODUCTS_FILE, CIRCUIT_MAX_BACKOFF_SECONDS
+from modules.catalog import ProductCatalog
+from modules.host_health import HostHealthTracker, THROTTLE_STATUSES, parse_retry_after
+from modules.link_health import LinkHealthStore
+from modules.link_resolver import LinkResolver, first_product_url
 
 IMAGES_DIR = PROJECT_ROOT / "public/images/parts"
+REQUEST_TIMEOUT = 30
+
+# Shared per-host circuit breaker: stop hammering GetFPV/Cloudflare once it starts throttling
+HOSTS = HostHealthTracker()
+
+def fetch(scraper, url, headers=None):
+    """
+    GET through the host circuit breaker. Waits out an open circuit's backoff first.
+    Returns the response, or None if the request timed out or was throttled.
+    """
+    delay = HOSTS.retry_in(url)
+    if delay > 0:
+        print(f"  -> Host backing off, waiting {delay:.0f}s...")
+        time.sleep(min(delay, CIRCUIT_MAX_BACKOFF_SECONDS))
+    if not HOSTS.allow(url):
+        return None
+
+    try:
+        resp = scraper.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.Timeout:
+        print(f"  -> Timed out: {url}")
+        HOSTS.record_failure(url)
+        return None
+    except requests.RequestException:
+        HOSTS.record_error(url)
+        raise
+
+    if resp.status_code in THROTTLE_STATUSES:
+        print(f"  -> Throttled ({resp.status_code}): {url}")
+        HOSTS.record_failure(url, parse_retry_after(resp))
+        return None
+    HOSTS.record_success(url)
+    return resp
 
 def scrape_images():
     print(f"Reading {PRODUCTS_FILE}...")
-    with open(PRODUCTS_FILE, 'r') as f:
-        data = json.load(f)
-    
-    products = data.get("products", [])
+    catalog = ProductCatalog()
+    products = catalog.products
     updated = False
     
     # Ensure directory exists
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
     
     scraper = cloudscraper.create_scraper()
+    # ETag/Last-Modified from earlier downloads, so unchanged images are not fetched again
+    store = LinkHealthStore()
+    # Search -> product page mappings shared with the Spider; a hit skips the search page entirely
+    resolver = LinkResolver()
     
     for i, product in enumerate(products):
         name = product.get("name")
@@ -40,32 +80,40 @@ def scrape_images():
         try:
             # 1. Search Page
             product_url = search_link
-            if "catalogsearch" in search_link:
+            cached_url = resolver.cached(search_link) if "catalogsearch" in search_link else None
+            if cached_url:
+                product_url = cached_url
+            elif "catalogsearch" in search_link:
                 # print(f"  -> Searching: {search_link}")
-                resp = scraper.get(search_link)
+                resp = fetch(scraper, search_link)
                 # Cloudscraper doesn't raise_for_status by default the same way, but let's check
+                if resp is None:
+                    continue
                 if resp.status_code != 200:
                     print(f"  -> Failed to load search page: {resp.status_code}")
                     continue
                     
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
                 # Find first product link
-                product_item = soup.select_one('a.product-item-link')
-                if not product_item:
+                found_url = first_product_url(search_link, resp.text)
+                resolver.remember(search_link, found_url)
+                if not found_url:
                     print("  -> No products found in search.")
                     continue
                     
-                product_url = product_item['href']
+                product_url = found_url
                 # print(f"  -> Found Product URL: {product_url}")
 
             # 2. Product Page
             if product_url != search_link:
                 time.sleep(1) # Polite delay
                 
-            resp = scraper.get(product_url)
+            resp = fetch(scraper, product_url)
+            if resp is None:
+                continue
             if resp.status_code != 200:
                 print(f"  -> Failed to load product page: {resp.status_code}")
+                if product_url == cached_url:
+                    resolver.forget(search_link)
                 continue
                 
             soup = BeautifulSoup(resp.text, 'html.parser')
@@ -99,20 +147,27 @@ def scrape_images():
             new_filename = f"{slug}{ext}"
             local_path = IMAGES_DIR / new_filename
             
-            # Skip if we already have it and it's not low res (simple optimization to save time?)
-            # But the requirement is to update images. Let's overwrite to ensure quality.
+            # Overwrite to ensure quality, unless the server confirms our copy is current
+            conditional = store.conditional_headers(img_url) if local_path.exists() else {}
             
-            img_resp = scraper.get(img_url)
-            if img_resp.status_code == 200:
-                with open(local_path, 'wb') as f_img:
-                    f_img.write(img_resp.content)
-                # print(f"  -> Saved to: {local_path.name}")
+            img_resp = fetch(scraper, img_url, headers=conditional)
+            if img_resp is None:
+                continue
+            if img_resp.status_code in (200, 304):
+                if img_resp.status_code == 304:
+                    print(f"  -> Image unchanged, keeping {local_path.name}")
+                else:
+                    with open(local_path, 'wb') as f_img:
+                        f_img.write(img_resp.content)
+                    store.save_validators(img_url, img_resp.headers.get("ETag"), img_resp.headers.get("Last-Modified"))
+                    # print(f"  -> Saved to: {local_path.name}")
                 
                 # 5. Update JSON if needed
                 new_image_path = f"/images/parts/{new_filename}"
                 if current_image != new_image_path:
                     print(f"  -> Updating products.json: {current_image} -> {new_image_path}")
                     product["imageUrl"] = new_image_path
+                    catalog.mark_dirty(product)
                     updated = True
             else:
                 print(f"  -> Failed to download image: {img_resp.status_code}")
@@ -123,10 +178,11 @@ def scrape_images():
             print(f"  -> Error: {e}")
             continue
 
+    store.close()
+    resolver.close()
     if updated:
         print("Saving updated products.json...")
-        with open(PRODUCTS_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        catalog.compact()
     else:
         print("No changes to products.json.")
 
@@ -1,12 +1,16 @@
-import json
 import logging
 import sys
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-PRODUCTS_FILE = 'src/data/products.json'
-
 DOSSIERS = {
     "RadioMaster Pocket": {
         "dossier": """MISSION ROLE: COVERT OPS / BACKPACK CARRY
@@ -68,12 +72,10 @@ WHY YOU NEED IT: Buying a drone without a soldering iron is like buying a car wi
 
 def update_dossiers():
     try:
-        with open(PRODUCTS_FILE, 'r') as f:
-            data = json.load(f)
-        
+        catalog = ProductCatalog()
         updated_count = 0
         
-        for product in data['products']:
+        for product in catalog.products:
             # Check by name matching
             for name_key, info in DOSSIERS.items():
                 if name_key in product['name']:
@@ -81,10 +83,10 @@ def update_dossiers():
                     product['dossier'] = info['dossier']
                     if 'hazardLevel' in info:
                         product['hazardLevel'] = info['hazardLevel']
+                    catalog.mark_dirty(product)
                     updated_count += 1
         
-        with open(PRODUCTS_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        catalog.compact()
             
         logging.info(f"Successfully updated {updated_count} products.")
         
@@ -1,18 +1,21 @@
-import json
-import os
+import sys
+from pathlib import Path
 
-PRODUCTS_FILE = 'src/data/products.json'
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
 
 def update_images():
     try:
-        with open(PRODUCTS_FILE, 'r') as f:
-            data = json.load(f)
-        
-        products = data.get("products", [])
+        catalog = ProductCatalog()
+        products = catalog.products
         count = 0
         
         # Mapping logic
         for p in products:
+            before = p.get("imageUrl")
             name = p.get("name", "").lower()
             category = p.get("category", "").lower()
             
@@ -45,6 +48,8 @@ def update_images():
                 "/images/parts/sequre-ts101.png"
             ]:
                 count += 1
+                if p.get("imageUrl") != before:
+                    catalog.mark_dirty(p)
                 continue
             
             # Category Logic
@@ -71,9 +76,10 @@ def update_images():
                  p["imageUrl"] = "/images/parts/generic-lipo.png"
 
             count += 1
+            if p.get("imageUrl") != before:
+                catalog.mark_dirty(p)
 
-        with open(PRODUCTS_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        catalog.compact()
             
         print(f"Updated images for {count} products.")
         
@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 from pathlib import Path
@@ -6,6 +5,8 @@ from pathlib import Path
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "agent"))
+from modules.catalog import ProductCatalog
 
 PRODUCTS_FILE = PROJECT_ROOT / "src/data/products.json"
 IMAGES_DIR = PROJECT_ROOT / "public/images/parts"
@@ -13,8 +14,7 @@ IMAGES_DIR = PROJECT_ROOT / "public/images/parts"
 def verify_images():
     print(f"Verifying images in {PRODUCTS_FILE}...")
     
-    with open(PRODUCTS_FILE, 'r') as f:
-        data = json.load(f)
+    data = ProductCatalog().data
     
     products = data.get("products", [])
     missing_images = []
@@ -1,3 +1,4 @@
+import crypto from 'crypto';
 import fs from 'fs';
 import path from 'path';
 import matter from 'gray-matter';
@@ -16,39 +17,109 @@ export type Article = {
     content: string;
 };
 
-export function getAllArticles(): Article[] {
+export type ArticleSummary = Omit<Article, 'content'> & {
+    wordCount?: number;
+};
+
+// Maintained by the agent (Author.save_article, the Spider's link audit, and
+// agent/scripts/rebuild_article_index.py), newest first. A hand edit to an article is not
+// in it until one of those runs, so it is only trusted while every file matches its recorded
+// hash (mtimes can't tell: a git checkout writes the articles after the index).
+const articlesIndexFile = path.join(process.cwd(), 'src/data/articles.index.json');
+
+// Author's generated posts carry `categories`; the hand-written ones use `tags`
+// (same rule as article_entry in agent/modules/article_manifest.py)
+function tagsFrom(data: { [key: string]: any }): string[] {
+    const tags = data.tags || data.categories || [];
+    return Array.isArray(tags) ? tags : [tags];
+}
+
+type ArticlesIndexEntry = {
+    slug: string;
+    file: string;
+    title: string;
+    excerpt: string;
+    date: string;
+    author: string;
+    category: string;
+    image?: string | null;
+    tags: string[];
+    wordCount: number;
+    hash: string;
+};
+
+function readArticlesIndex(fileNames: string[]): ArticleSummary[] | null {
+    if (!fs.existsSync(articlesIndexFile)) {
+        return null;
+    }
+    try {
+        const entries: ArticlesIndexEntry[] = JSON.parse(fs.readFileSync(articlesIndexFile, 'utf8')).articles;
+        // A post added, removed or edited by hand since the index was written: parse the files instead
+        const indexed = new Set(entries.map((entry) => entry.file));
+        if (indexed.size !== fileNames.length || !fileNames.every((name) => indexed.has(name))) {
+            return null;
+        }
+        // Hashing the raw bytes is still far cheaper than parsing every file's frontmatter
+        const hashes = new Map(entries.map((entry) => [entry.file, entry.hash]));
+        const changed = fileNames.some((name) => {
+            const data = fs.readFileSync(path.join(articlesDirectory, name));
+            return crypto.createHash('sha256').update(data).digest('hex') !== hashes.get(name);
+        });
+        if (changed) {
+            return null;
+        }
+        return entries.map((entry) => ({
+            slug: entry.slug,
+            title: entry.title,
+            excerpt: entry.excerpt,
+            date: entry.date,
+            author: entry.author,
+            category: entry.category,
+            image: entry.image ?? undefined,
+            tags: entry.tags || [],
+            wordCount: entry.wordCount,
+        }));
+    } catch (e) {
+        return null;
+    }
+}
+
+export function getAllArticles(): ArticleSummary[] {
     // Create directory if it doesn't exist to prevent build errors
     if (!fs.existsSync(articlesDirectory)) {
         return [];
     }
 
-    const fileNames = fs.readdirSync(articlesDirectory);
+    const fileNames = fs.readdirSync(articlesDirectory).filter((fileName) => fileName.endsWith('.md'));
+    const indexed = readArticlesIndex(fileNames);
+    if (indexed) {
+        return indexed;
+    }
+
     const allArticlesData = fileNames.map((fileName) => {
         const slug = fileName.replace(/\.md$/, '');
         const fullPath = path.join(articlesDirectory, fileName);
         const fileContents = fs.readFileSync(fullPath, 'utf8');
-        const { data, content } = matter(fileContents);
+        const { data } = matter(fileContents);
 
         return {
             slug,
-            content,
             title: data.title,
             excerpt: data.excerpt,
             date: data.date,
             author: data.author,
             category: data.category,
             image: data.image,
-            tags: data.tags || [],
+            tags: tagsFrom(data),
         };
     });
 
-    // Sort articles by date
+    // Sort articles by date, newest first (slug breaks ties, as in the index)
     return allArticlesData.sort((a, b) => {
-        if (a.date < b.date) {
-            return 1;
-        } else {
-            return -1;
+        if (a.date !== b.date) {
+            return a.date < b.date ? 1 : -1;
         }
+        return a.slug < b.slug ? 1 : -1;
     });
 }
 
@@ -67,7 +138,7 @@ export function getArticleBySlug(slug: string): Article | null {
             author: data.author,
             category: data.category,
             image: data.image,
-            tags: data.tags || [],
+            tags: tagsFrom(data),
         };
     } catch (e) {
         return null;